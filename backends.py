@@ -0,0 +1,21 @@
+import importlib
+
+from instrument import timed
+
+# Heavy libraries (statsmodels, TensorFlow, matplotlib) live in these modules and
+# are only imported the first time a backend is requested.
+BACKENDS = {
+    "sarimax": "forecast_sarimax",
+    "lstm": "forecast_lstm",
+    "lstm_numpy": "lstm_inference",
+    "plot": "plotting",
+}
+
+def register_backend(name, module):
+    BACKENDS[name] = module
+
+@timed()
+def get_backend(name):
+    if name not in BACKENDS:
+        raise KeyError(f"Unknown backend: {name}")
+    return importlib.import_module(BACKENDS[name])
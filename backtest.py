@@ -0,0 +1,175 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import get_backend
+from batch_forecast import PRELOAD
+from instrument import timed
+from journal import write_atomic
+from lstm_inference import FEATURES, fingerprint
+from parallel import run_parallel
+
+CACHE_DIR = os.path.join("cache", "backtest")
+MODELS = ("sarimax", "lstm")
+MODES = ("expanding", "rolling")
+HORIZON = 5
+STEP = 21
+MIN_TRAIN = 252
+ROLLING_WINDOW = 500
+
+def fold_cutoffs(rows, horizon=HORIZON, min_train=MIN_TRAIN, step=STEP):
+    # Cutoffs are anchored at the start of the history, so appending bars only adds folds at the end
+    # and every earlier fold keeps its key in the cache.
+    return list(range(min_train, rows - horizon + 1, step))
+
+def training_slice(stock_data, cutoff, mode="expanding", window=ROLLING_WINDOW):
+    if mode == "expanding":
+        return stock_data.iloc[:cutoff]
+    if mode == "rolling":
+        return stock_data.iloc[max(cutoff - window, 0):cutoff]
+    raise ValueError(f"Unknown backtest mode: {mode}")
+
+def fold_fingerprint(train):
+    return fingerprint(train[FEATURES].to_numpy(dtype=float))
+
+def cache_path(symbol, model, mode, window, horizon, cache_dir=CACHE_DIR):
+    size = f"{mode}{window}" if mode == "rolling" else mode
+    return os.path.join(cache_dir, f"{symbol}_{model}_{size}_h{horizon}.json")
+
+def load_folds(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def save_folds(path, folds):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, folds)
+
+def run_folds(model, stock_data, cutoffs, horizon, mode, window, threads=1):
+    # Runs several folds in one worker so each process pays the model import once.
+    backend = get_backend(model)
+    if model == "lstm":
+        backend.set_threads(threads)
+    forecasts = {}
+    for cutoff in cutoffs:
+        train = training_slice(stock_data, cutoff, mode, window)
+        # The backtest controls the training window itself, so SARIMAX must not trim it again.
+        options = {"window": None} if model == "sarimax" else {}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            forecast = backend.forecast(train, days=horizon, **options)
+        forecasts[cutoff] = [float(value) for value in np.asarray(forecast)[:horizon]]
+    return forecasts
+
+def score_folds(stock_data, folds, horizon=HORIZON):
+    # One row per fold and step ahead. Forecasts are matched to the next trading days by position,
+    # and the naive baseline carries the last close forward.
+    close = stock_data['Close'].to_numpy(dtype=float)
+    rows = []
+    for cutoff, forecast in folds.items():
+        last_close = close[cutoff - 1]
+        for step, predicted in enumerate(forecast[:horizon]):
+            rows.append((stock_data.index[cutoff - 1], step + 1, last_close, close[cutoff + step], predicted))
+    return pd.DataFrame(rows, columns=["cutoff", "step", "last_close", "actual", "forecast"])
+
+def summarize(scores):
+    error = scores["forecast"] - scores["actual"]
+    naive_error = scores["last_close"] - scores["actual"]
+    moved = scores["actual"] != scores["last_close"]
+    direction = np.sign(scores["forecast"] - scores["last_close"]) == np.sign(scores["actual"] - scores["last_close"])
+    mae, naive_mae = error.abs().mean(), naive_error.abs().mean()
+    return {
+        "folds": scores["cutoff"].nunique(),
+        "mae": mae,
+        "rmse": np.sqrt((error ** 2).mean()),
+        "directional_accuracy": direction[moved].mean(),
+        "naive_mae": naive_mae,
+        "naive_rmse": np.sqrt((naive_error ** 2).mean()),
+        "mae_skill": 1 - mae / naive_mae if naive_mae else np.nan,
+    }
+
+@timed()
+def backtest(symbol, stock_data, models=MODELS, horizon=HORIZON, step=STEP, min_train=MIN_TRAIN, mode="expanding",
+             window=ROLLING_WINDOW, max_workers=None, timeout=None, cache_dir=CACHE_DIR):
+    max_workers = max_workers or os.cpu_count() or 1
+    cutoffs = fold_cutoffs(len(stock_data), horizon, min_train, step)
+    cached, missing = {}, {}
+    for model in models:
+        path = cache_path(symbol, model, mode, window, horizon, cache_dir)
+        cached[model] = load_folds(path)
+        for cutoff in cutoffs:
+            key = stock_data.index[cutoff - 1].strftime('%Y-%m-%d')
+            entry = cached[model].get(key)
+            if entry is None or entry["fingerprint"] != fold_fingerprint(training_slice(stock_data, cutoff, mode, window)):
+                missing.setdefault(model, []).append(cutoff)
+
+    # Missing folds are dealt round-robin into at most max_workers chunks per model, so early
+    # (short) and late (long) training windows are spread evenly across workers.
+    tasks = []
+    for model, model_cutoffs in missing.items():
+        chunks = min(max_workers, len(model_cutoffs))
+        threads = max(1, (os.cpu_count() or 1) // max_workers)
+        tasks.extend((model, stock_data, model_cutoffs[i::chunks], horizon, mode, window, threads) for i in range(chunks))
+
+    start = time.perf_counter()
+    results = run_parallel(run_folds, tasks, max_workers, timeout, PRELOAD) if tasks else []
+    wall_time = time.perf_counter() - start
+
+    errors = {}
+    for (model, _, chunk, *_), (status, value) in zip(tasks, results):
+        if status != "ok":
+            dates = ", ".join(stock_data.index[cutoff - 1].strftime('%Y-%m-%d') for cutoff in chunk)
+            errors.setdefault(model, []).append(f"{value if status == 'error' else 'timeout'} (folds ending {dates})")
+            continue
+        for cutoff, forecast in value.items():
+            key = stock_data.index[cutoff - 1].strftime('%Y-%m-%d')
+            cached[model][key] = {"fingerprint": fold_fingerprint(training_slice(stock_data, cutoff, mode, window)), "forecast": forecast}
+
+    summary, scores = {}, {}
+    for model in models:
+        save_folds(cache_path(symbol, model, mode, window, horizon, cache_dir), cached[model])
+        folds = {}
+        for cutoff in cutoffs:
+            entry = cached[model].get(stock_data.index[cutoff - 1].strftime('%Y-%m-%d'))
+            if entry is not None:
+                folds[cutoff] = entry["forecast"]
+        if not folds:
+            continue
+        scores[model] = score_folds(stock_data, folds, horizon)
+        summary[model] = dict(summarize(scores[model]), computed=len(missing.get(model, [])))
+    return pd.DataFrame.from_dict(summary, orient="index"), scores, {"wall_time": wall_time, "errors": errors}
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the SARIMAX and LSTM forecasters.")
+    parser.add_argument("symbols", nargs="+", help="IDX stock codes, e.g. BBCA")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="trading days forecast by each fold")
+    parser.add_argument("--step", type=int, default=STEP, help="trading days between fold cutoffs")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN, help="trading days in the first training window")
+    parser.add_argument("--mode", choices=MODES, default="expanding")
+    parser.add_argument("--window", type=int, default=ROLLING_WINDOW, help="training window for --mode rolling")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds allowed per worker")
+    args = parser.parse_args()
+
+    from datastore import PriceStore
+
+    store = PriceStore()
+    for symbol in args.symbols:
+        stock_data = store.history(f"{symbol}.JK", period="max")
+        summary, _, info = backtest(symbol, stock_data, args.models, args.horizon, args.step, args.min_train, args.mode,
+                                    args.window, args.workers, args.timeout)
+        print(f"\n{symbol} ({info['wall_time']:.1f}s)")
+        print(summary.to_string())
+        for model, errors in info["errors"].items():
+            for error in errors:
+                print(f"{model}: {error}")
+
+if __name__ == "__main__":
+    main()
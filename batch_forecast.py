@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from backends import get_backend
+from parallel import run_parallel
+
+MODELS = ("sarimax", "lstm")
+TITLES = {"sarimax": "Actual vs Predicted (SARIMAX)", "lstm": "Actual vs Forecasted (LSTM)"}
+# Imported once by the fork server instead of once per task. TensorFlow is left out on purpose:
+# it is not fork-safe once initialised, so LSTM tasks import it in their own process.
+PRELOAD = ["pandas", "statsmodels.tsa.statespace.sarimax", "matplotlib.figure", "lstm_inference"]
+
+def forecast_task(symbol, model, stock_data, days, output_dir, threads=1):
+    start = time.perf_counter()
+    # Tickers whose cached LSTM is current are forecast in NumPy, so the worker never imports TensorFlow.
+    forecast = get_backend("lstm_numpy").forecast(stock_data, days=days, symbol=symbol) if model == "lstm" else None
+    if forecast is None:
+        backend = get_backend(model)
+        if model == "lstm":
+            # Each worker gets a slice of the machine instead of every worker claiming every core.
+            backend.set_threads(threads)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            forecast = backend.forecast(stock_data, days=days, symbol=symbol)
+
+    csv_path = os.path.join(output_dir, f"{symbol}_{model}.csv")
+    forecast.to_csv(csv_path, index_label="Date")
+    plot_path = get_backend("plot").save_forecast(
+        stock_data['Close'], forecast, f"{symbol} Stock Price - {TITLES[model]}", os.path.join(output_dir, f"{symbol}_{model}.png")
+    )
+    return {
+        "forecast": {date.strftime('%Y-%m-%d'): float(value) for date, value in forecast.items()},
+        "csv": csv_path,
+        "plot": plot_path,
+        "seconds": time.perf_counter() - start,
+    }
+
+def run_batch(symbols, store, models=MODELS, days=7, output_dir="forecasts", max_workers=None, timeout=600, threads=None):
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    # TensorFlow threads per LSTM worker; by default the cores are split evenly between the workers.
+    threads = threads or max(1, (os.cpu_count() or 1) // max_workers)
+    histories = store.history_many([f"{symbol}.JK" for symbol in symbols], period="max")
+    tasks = [
+        (symbol, model, histories[f"{symbol}.JK"], days, output_dir, threads)
+        for symbol in symbols for model in models if not histories[f"{symbol}.JK"].empty
+    ]
+
+    start = time.perf_counter()
+    results = run_parallel(forecast_task, tasks, max_workers, timeout, PRELOAD)
+    wall_time = time.perf_counter() - start
+
+    summary, rows = {}, []
+    for (symbol, model, *_), (status, value) in zip(tasks, results):
+        entry = {"status": status}
+        if status == "ok":
+            entry.update(value)
+            rows.extend((symbol, model, date, price) for date, price in value["forecast"].items())
+        elif status == "error":
+            entry["error"] = value
+        summary.setdefault(symbol, {})[model] = entry
+
+    with open(os.path.join(output_dir, "forecasts.json"), 'w') as file:
+        json.dump({"wall_time": wall_time, "results": summary}, file, indent=2)
+    pd.DataFrame(rows, columns=["Symbol", "Model", "Date", "Forecast"]).to_csv(os.path.join(output_dir, "forecasts.csv"), index=False)
+    return summary, wall_time
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast every holding in the portfolio without opening any windows.")
+    parser.add_argument("--portfolio", default="stock_data.json")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--output", default="forecasts")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per forecast")
+    parser.add_argument("--threads", type=int, default=None, help="TensorFlow threads per LSTM worker (default: cores / workers)")
+    args = parser.parse_args()
+
+    from main import PortofolioManager
+
+    stock_manager = PortofolioManager()
+    stock_manager.load_from_file(args.portfolio)
+    summary, wall_time = run_batch(list(stock_manager.get_all_stocks()), stock_manager.store, args.models, args.days, args.output, args.workers, args.timeout, args.threads)
+
+    for symbol, models in summary.items():
+        for model, entry in models.items():
+            print(f"{symbol:<8}{model:<10}{entry['status']}")
+    print(f"Finished in {wall_time:.1f}s. Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
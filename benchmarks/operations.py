@@ -0,0 +1,223 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import zlib
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# plt.show() must return immediately and TensorFlow must stay quiet while operations are timed.
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from prettytable import PrettyTable
+
+import main as app
+from calculator import ipo_warrant_bep
+from datastore import PriceStore, normalize_frame, period_start
+
+SIZES = [5, 50, 500]
+HISTORY_DAYS = 1500
+BENCHMARK = "^JKSE"
+
+class RecordedProvider:
+    # Stands in for yf.Ticker and yf.download. Serves {symbol}.csv from a recording directory when
+    # one exists, otherwise a synthetic series seeded by the symbol name, and counts every call.
+    def __init__(self, directory=None, days=HISTORY_DAYS):
+        self.directory = directory
+        self.days = days
+        # Built once: generating business-day ranges is far slower than anything the stand-in should cost.
+        self.index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, name="Date")
+        self.calls = 0
+        self._frames = {}
+        self._market = np.random.default_rng(zlib.crc32(BENCHMARK.encode())).normal(0.0003, 0.01, days)
+
+    def _synthetic(self, symbol):
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        returns = self._market if symbol == BENCHMARK else (0.5 + rng.random()) * self._market + rng.normal(0, 0.015, self.days)
+        close = 1000 * np.exp(np.cumsum(returns))
+        return pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.003, self.days)),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": rng.integers(100_000, 10_000_000, self.days).astype(float),
+        }, index=self.index)
+
+    def frame(self, symbol):
+        if symbol not in self._frames:
+            path = None if self.directory is None else os.path.join(self.directory, f"{symbol}.csv")
+            if path is not None and os.path.exists(path):
+                self._frames[symbol] = normalize_frame(pd.read_csv(path, index_col=0, parse_dates=True))
+            else:
+                self._frames[symbol] = self._synthetic(symbol)
+        return self._frames[symbol]
+
+    def _slice(self, symbol, period=None, start=None, end=None):
+        frame = self.frame(symbol)
+        start = period_start(period) if start is None and period is not None else start
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+        return frame.copy()
+
+    def ticker(self, symbol, *args, **kwargs):
+        provider = self
+
+        class Ticker:
+            def history(self, period=None, start=None, end=None, **kwargs):
+                provider.calls += 1
+                return provider._slice(symbol, period, start, end)
+
+        return Ticker()
+
+    def download(self, tickers, period=None, start=None, end=None, group_by="column", **kwargs):
+        self.calls += 1
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        if len(symbols) == 1:
+            return self._slice(symbols[0], period, start, end)
+        return pd.concat({symbol: self._slice(symbol, period, start, end) for symbol in symbols}, axis=1)
+
+    @contextlib.contextmanager
+    def patch(self):
+        with mock.patch.object(yf, "Ticker", self.ticker), mock.patch.object(yf, "download", self.download):
+            yield self
+
+def portfolio_symbols(size, directory=None):
+    if directory is not None:
+        recorded = sorted(name[:-7] for name in os.listdir(directory) if name.endswith(".JK.csv"))
+        if len(recorded) >= size:
+            return recorded[:size]
+    return [f"T{i:03d}" for i in range(size)]
+
+def build_manager(symbols, store):
+    manager = app.PortofolioManager(store)
+    manager.load_from_file("stock_data.json")
+    for i, item in enumerate(symbols):
+        manager.add_stock(item, 1 + i % 10, 1000.0)
+    return manager
+
+def bep_for_holdings(manager):
+    for info in manager.get_all_stocks().values():
+        ipo_warrant_bep(info['price'], 1, 1, 2)
+
+# name: (callable taking the manager, whether its cost grows with the portfolio size)
+OPERATIONS = {
+    "display_portofolio": (lambda manager: manager.display_portofolio(), True),
+    "overall_portfolio_performance": (lambda manager: app.PortofolioAnalysis(manager).overall_portfolio_performance(), True),
+    "display_risk_metrics": (lambda manager: app.PortofolioAnalysis(manager).display_risk_metrics(), True),
+    "sarimax_forecast": (lambda manager: app.QuantitativeAnalysis(next(iter(manager.stock)), manager.store).sarimax_forecast(), False),
+    "lstm_forecast": (lambda manager: app.QuantitativeAnalysis(next(iter(manager.stock)), manager.store).lstm_forecast(), False),
+    "ipo_warrant_bep": (bep_for_holdings, True),
+}
+
+def _timed(func, manager, provider, trace):
+    calls = provider.calls
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        func(manager)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else None
+    if trace:
+        tracemalloc.stop()
+    return seconds, peak, provider.calls - calls
+
+def run_operation(name, size, directory=None, memory=True):
+    # Each measurement starts from an empty price cache and model cache in its own working directory:
+    # the first run is cold, the second reuses whatever the first one cached.
+    func, _ = OPERATIONS[name]
+    symbols = portfolio_symbols(size, directory)
+    result = {"operation": name, "size": size}
+    cwd = os.getcwd()
+    for phase in (["memory"] if memory else []) + ["timing"]:
+        provider = RecordedProvider(directory)
+        with tempfile.TemporaryDirectory() as workdir, provider.patch():
+            os.chdir(workdir)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    store = PriceStore()
+                    manager = build_manager(symbols, store)
+                if phase == "memory":
+                    result["peak_mb"] = _timed(func, manager, provider, True)[1] / 2 ** 20
+                else:
+                    result["cold_seconds"], _, result["cold_calls"] = _timed(func, manager, provider, False)
+                    result["warm_seconds"], _, result["warm_calls"] = _timed(func, manager, provider, False)
+                store.close()
+            finally:
+                os.chdir(cwd)
+    return result
+
+def run_suite(sizes=SIZES, operations=None, directory=None, memory=True):
+    results = []
+    for name in operations or list(OPERATIONS):
+        scaled = OPERATIONS[name][1]
+        for size in sizes if scaled else [min(sizes)]:
+            results.append(run_operation(name, size, directory, memory))
+    return results
+
+def compare(results, baseline, tolerance=1.5):
+    # Wall time and memory may drift by `tolerance` plus a small absolute slack, so millisecond-scale
+    # operations do not trip on scheduler noise; provider calls are deterministic and must not grow.
+    previous = {(row["operation"], row["size"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row["operation"], row["size"]))
+        if before is None:
+            continue
+        for key, slack in [("cold_seconds", 0.05), ("warm_seconds", 0.05), ("peak_mb", 1.0)]:
+            if key in row and key in before and row[key] > before[key] * tolerance + slack:
+                regressions.append(f"{row['operation']} (size {row['size']}): {key} {before[key]:.3f} -> {row[key]:.3f}")
+        for key in ["cold_calls", "warm_calls"]:
+            if row[key] > before[key]:
+                regressions.append(f"{row['operation']} (size {row['size']}): {key} {before[key]} -> {row[key]}")
+    return regressions
+
+def print_results(results):
+    table = PrettyTable()
+    table.field_names = ["Operation", "Size", "Cold (s)", "Warm (s)", "Peak Memory (MB)", "Provider Calls (cold)", "Provider Calls (warm)"]
+    for row in results:
+        peak = f"{row['peak_mb']:.1f}" if "peak_mb" in row else "-"
+        table.add_row([row["operation"], row["size"], f"{row['cold_seconds']:.3f}", f"{row['warm_seconds']:.3f}", peak, row["cold_calls"], row["warm_calls"]])
+    print(table)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the menu operations against a local stand-in for yfinance.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="portfolio sizes to measure")
+    parser.add_argument("--operations", nargs="+", choices=list(OPERATIONS), help="operations to measure (default: all)")
+    parser.add_argument("--fixtures", help="directory of recorded {symbol}.csv files; missing symbols are synthesized")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against; exits non-zero on a regression")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor against the baseline")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.operations, args.fixtures, not args.no_memory)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("OK: no regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN = ["tensorflow", "statsmodels", "sklearn", "matplotlib"]
+
+# Runs the portfolio-only path in a fresh interpreter: build the manager, load the
+# portfolio file and pass through the main menu straight to "Save and Quit".
+SCRIPT = f"""
+import io
+import json
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+sys.path.insert(0, {ROOT!r})
+import main
+
+manager = main.PortofolioManager()
+manager.load_from_file("stock_data.json")
+sys.stdin = io.StringIO("5\\n")
+main.main()
+
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in {FORBIDDEN!r} if name in sys.modules],
+}}))
+"""
+
+def measure():
+    import json
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, "stock_data.json"), "w") as file:
+            json.dump({"BBCA": {"quantity": 1, "price": 9000.0}}, file)
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT], cwd=workdir, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    result = measure()
+    print(f"Startup to menu exit: {result['seconds']:.2f}s, peak RSS {result['max_rss_mb']:.0f} MB")
+    if result["loaded"]:
+        print(f"FAIL: portfolio-only path imported {', '.join(result['loaded'])}")
+        sys.exit(1)
+    print("OK: no forecasting or plotting backends imported")
+
+if __name__ == "__main__":
+    main()
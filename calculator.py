@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# IDX price fractions: (lower bound of the price band, tick size).
+TICK_BANDS = [(0, 1), (200, 2), (500, 5), (2000, 10), (5000, 25)]
+# Lowest price on the regular and watchlist boards (0-2); the acceleration board (3) has no such floor.
+FLOOR_PRICE = 50
+# Relative results this close to zero are break-even, not profit.
+BEP_TOLERANCE = 1e-9
+# Boards as the warrant BEP menu numbers them: 1 = Utama/Pengembangan, 2 = Akselerasi.
+BEP_BOARDS = (1, 2)
+
+def get_max_gain(price, input_str, board):
+    if price <= 50 and board != 3:
+        return 0.0
+    elif input_str.upper() == "ARA":
+        if board in {0, 1, 2}:
+            if 50 <= price <= 200:
+                return 0.35
+            elif price <= 5000:
+                return 0.25
+            else:
+                return 0.20
+        elif board == 3:
+            return 0.1
+        else:
+            return -3
+    elif input_str.upper() == "ARB":
+        if board == 0:
+            return -0.07
+        elif board == 1:
+            return -0.15
+        elif board == 2:
+            if 50 <= price <= 200:
+                return -0.35
+            elif price <= 5000:
+                return -0.25
+            else:
+                return -0.20
+        elif board == 3:
+            return -0.1
+        else:
+            return -3
+    else:
+        return -3
+
+def max_gain_array(prices, input_str, boards):
+    prices, boards = np.broadcast_arrays(np.asarray(prices, dtype=float), np.asarray(boards))
+    band = np.select([prices <= 200, prices <= 5000], [0.35, 0.25], 0.20)
+    if input_str.upper() == "ARA":
+        gain = np.select([np.isin(boards, (0, 1, 2)), boards == 3], [band, 0.1], -3)
+    elif input_str.upper() == "ARB":
+        gain = np.select([boards == 0, boards == 1, boards == 2, boards == 3], [-0.07, -0.15, -band, -0.1], -3)
+    else:
+        gain = np.full(prices.shape, -3.0)
+    return np.where((prices <= 50) & (boards != 3), 0.0, gain)
+
+def price_limits(prices, boards):
+    # Next session's ARA and ARB prices on the tick grid. max_gain_array follows get_max_gain, which
+    # gives a stock on the floor no room either way; here the floor is a valid reference price, so such
+    # a stock can still rise by the lowest band's ARA, and no board 0-2 limit goes below the floor.
+    prices, boards = np.broadcast_arrays(np.asarray(prices, dtype=float), np.asarray(boards))
+    regular = boards != 3
+    reference = np.where(regular & (prices <= FLOOR_PRICE), FLOOR_PRICE + 1, prices)
+    upper = round_to_tick(prices * (1 + max_gain_array(reference, "ARA", boards)), "down")
+    lower = round_to_tick(prices * (1 + max_gain_array(prices, "ARB", boards)), "up")
+    return upper, np.where(regular, np.maximum(lower, FLOOR_PRICE), lower)
+
+def tick_size(prices):
+    prices = np.asarray(prices, dtype=float)
+    lower_bounds = [lower for lower, _ in TICK_BANDS]
+    ticks = np.array([tick for _, tick in TICK_BANDS], dtype=float)
+    return ticks[np.searchsorted(lower_bounds, prices, side="right") - 1]
+
+def round_to_tick(prices, direction="nearest"):
+    prices = np.asarray(prices, dtype=float)
+    ticks = tick_size(prices)
+    rounding = {"up": np.ceil, "down": np.floor, "nearest": np.round}[direction]
+    # Band edges are multiples of the next band's tick, so rounding with the current band's tick stays on the grid.
+    return rounding(np.round(prices / ticks, 9)) * ticks
+
+def ipo_warrant_bep_array(stock_prices, boards, warrants, stocks):
+    if not np.isin(boards, BEP_BOARDS).all():
+        raise ValueError(f"Board must be one of {', '.join(map(str, BEP_BOARDS))}, got {boards}")
+    stock_prices, boards, warrants, stocks = np.broadcast_arrays(
+        np.asarray(stock_prices, dtype=float), np.asarray(boards) + 1, np.asarray(warrants, dtype=float), np.asarray(stocks, dtype=float)
+    )
+    multiplier = warrants / stocks
+    loss = stock_prices * (1 + max_gain_array(stock_prices, "ARB", boards))
+
+    # Break even when the warrant proceeds cover the loss of the shares at ARB:
+    # loss + price * multiplier > stock_price.
+    break_even = (stock_prices - loss) / multiplier
+    price = np.maximum(round_to_tick(break_even, "up"), 1.0)
+    result = (loss + price * multiplier) / stock_prices - 1
+    # A break-even exactly on a tick leaves rounding noise (~1e-16) in the result; that price only
+    # breaks even, so it must move up a tick like a result of exactly zero would.
+    price = np.where(result <= BEP_TOLERANCE, price + tick_size(price), price)
+    result = (loss + price * multiplier) / stock_prices - 1
+    return price, result
+
+def ipo_warrant_bep(stock_price, board, warrant, stock):
+    price, result = ipo_warrant_bep_array(stock_price, board, warrant, stock)
+    return float(price), float(result)
+
+def ipo_warrant_bep_grid(stock_prices, ratios, boards=(1, 2)):
+    ratios = np.atleast_2d(np.asarray(ratios, dtype=float))
+    if ratios.ndim != 2 or ratios.shape[1] != 2:
+        raise ValueError("Warrant ratios must be (stock, warrant) pairs")
+    price_grid, ratio_grid, board_grid = np.meshgrid(
+        np.asarray(stock_prices, dtype=float), np.arange(len(ratios)), np.asarray(boards), indexing="ij"
+    )
+    price, result = ipo_warrant_bep_array(price_grid, board_grid, ratios[ratio_grid, 1], ratios[ratio_grid, 0])
+    labels = np.array([f"{stock:g}:{warrant:g}" for stock, warrant in ratios])
+    return pd.DataFrame({
+        "stock_price": price_grid.ravel(),
+        "ratio": labels[ratio_grid.ravel()],
+        "board": board_grid.ravel(),
+        "warrant_bep": price.ravel(),
+        "result": result.ravel(),
+    })
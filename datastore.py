@@ -0,0 +1,310 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yfinance as yf
+
+from instrument import record_fetch, span, timed
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Reach back past weekends and exchange holidays so short periods such as "1d" always include a bar.
+FETCH_MARGIN = pd.Timedelta(days=14)
+# Backfills without a start begin here: older than any listing, and unlike period="max" it keeps the end.
+EARLIEST_START = pd.Timestamp("1950-01-01")
+# A re-fetched bar whose close moved by more than this fraction was re-adjusted by the provider
+# (split or dividend), so every stored bar of that symbol is stale.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+def empty_frame():
+    return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+def normalize_frame(data):
+    if data is None or data.empty:
+        return empty_frame()
+    data = data.reindex(columns=COLUMNS).astype(float)
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data.index = index.normalize().rename("Date")
+    data = data[~data.index.duplicated(keep="last")]
+    return data.sort_index()
+
+def period_start(period, today=None):
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today).normalize()
+    if period is None or period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    if period.endswith("mo"):
+        return today - pd.DateOffset(months=int(period[:-2]))
+    amount, unit = int(period[:-1]), period[-1]
+    if unit == "d":
+        return today - pd.Timedelta(days=amount - 1)
+    if unit == "y":
+        return today - pd.DateOffset(years=amount)
+    raise ValueError(f"Unsupported period: {period}")
+
+def with_retries(func, retries=3, backoff=1.0):
+    for attempt in range(retries):
+        try:
+            return func()
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+class RateLimiter:
+    def __init__(self, min_interval=0.2):
+        self.min_interval = min_interval
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+def fetch_concurrently(source, symbols, start=None, end=None, max_workers=8, rate_limiter=None, retries=3):
+    rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+
+    def fetch(symbol):
+        def call():
+            rate_limiter.wait()
+            return source.fetch(symbol, start, end)
+        try:
+            return with_retries(call, retries)
+        except Exception as e:
+            print(f"Failed to fetch {symbol}: {e}")
+            return empty_frame()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(symbols, executor.map(fetch, symbols)))
+
+def fetch_many(source, symbols, start=None, end=None):
+    if len(symbols) == 1:
+        return {symbols[0]: source.fetch(symbols[0], start, end)}
+    if hasattr(source, "fetch_many"):
+        return source.fetch_many(symbols, start, end)
+    return fetch_concurrently(source, symbols, start, end)
+
+class YFinanceSource:
+    def __init__(self, batch_size=50, max_workers=8, retries=3, timeout=10):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.retries = retries
+        # Seconds yfinance waits on each HTTP request.
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter()
+
+    def _range(self, start, end):
+        if start is None and end is None:
+            return {"period": "max"}
+        start = EARLIEST_START if start is None else start
+        return {"start": start.strftime("%Y-%m-%d"), "end": None if end is None else end.strftime("%Y-%m-%d")}
+
+    def fetch(self, symbol, start=None, end=None):
+        self.rate_limiter.wait()
+        return normalize_frame(yf.Ticker(symbol).history(timeout=self.timeout, **self._range(start, end)))
+
+    def _download(self, symbols, start, end):
+        self.rate_limiter.wait()
+        data = yf.download(symbols, group_by="ticker", auto_adjust=True, threads=False, progress=False, timeout=self.timeout, **self._range(start, end))
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {symbols[0]: normalize_frame(data.dropna(how="all"))}
+        present = set(data.columns.get_level_values(0))
+        return {symbol: normalize_frame(data[symbol].dropna(how="all")) if symbol in present else empty_frame() for symbol in symbols}
+
+    def fetch_many(self, symbols, start=None, end=None):
+        frames = {}
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            try:
+                frames.update(with_retries(lambda: self._download(batch, start, end), self.retries))
+            except Exception:
+                frames.update(fetch_concurrently(self, batch, start, end, self.max_workers, self.rate_limiter, self.retries))
+        return frames
+
+class FixtureSource:
+    def __init__(self, frames=None, directory=None):
+        self.frames = {symbol: normalize_frame(frame) for symbol, frame in (frames or {}).items()}
+        self.directory = directory
+        self.calls = 0
+
+    def _frame(self, symbol):
+        if symbol not in self.frames and self.directory is not None:
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            frame = pd.read_csv(path, index_col=0, parse_dates=True) if os.path.exists(path) else None
+            self.frames[symbol] = normalize_frame(frame)
+        frame = self.frames.get(symbol)
+        return empty_frame() if frame is None else frame
+
+    def _slice(self, symbol, start, end):
+        frame = self._frame(symbol)
+        if start is not None:
+            frame = frame[frame.index >= start]
+        if end is not None:
+            frame = frame[frame.index < end]
+        return frame.copy()
+
+    def fetch(self, symbol, start=None, end=None):
+        self.calls += 1
+        return self._slice(symbol, start, end)
+
+    def fetch_many(self, symbols, start=None, end=None):
+        self.calls += 1
+        return {symbol: self._slice(symbol, start, end) for symbol in symbols}
+
+class PriceStore:
+    def __init__(self, path=os.path.join("cache", "prices.db"), source=None, max_age=3600, quote_max_age=60):
+        self.path = path
+        self.source = source if source is not None else YFinanceSource()
+        # History is refreshed at most once per max_age seconds. Quotes shown as market prices use the
+        # much shorter quote_max_age, so the portfolio view is at most a minute behind the provider.
+        self.max_age = max_age
+        self.quote_max_age = quote_max_age
+        self.stats = {"hits": 0, "misses": 0, "rows_fetched": 0}
+        self._frames = {}
+        self._lock = threading.RLock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS prices (
+                symbol TEXT NOT NULL, date TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sync (
+                symbol TEXT PRIMARY KEY, first_requested TEXT, synced_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def _meta(self, symbol):
+        row = self._db.execute("SELECT first_requested, synced_at FROM sync WHERE symbol = ?", (symbol,)).fetchone()
+        if row is None:
+            return None
+        return {"first_requested": None if row[0] is None else pd.Timestamp(row[0]), "synced_at": row[1]}
+
+    def _load(self, symbol):
+        if symbol not in self._frames:
+            rows = self._db.execute(
+                "SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ? ORDER BY date", (symbol,)
+            ).fetchall()
+            if rows:
+                frame = pd.DataFrame(rows, columns=["Date"] + COLUMNS)
+                frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop("Date")), name="Date")
+                self._frames[symbol] = frame.astype(float)
+            else:
+                self._frames[symbol] = empty_frame()
+        return self._frames[symbol]
+
+    def _store(self, symbol, data, first_requested, synced_at):
+        if not data.empty:
+            rows = [(symbol, date, *values) for date, values in zip(data.index.strftime("%Y-%m-%d"), data[COLUMNS].to_numpy().tolist())]
+            self._db.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            frame = pd.concat([self._load(symbol), data])
+            self._frames[symbol] = frame[~frame.index.duplicated(keep="last")].sort_index()
+        self._db.execute(
+            "INSERT OR REPLACE INTO sync VALUES (?, ?, ?)",
+            (symbol, None if first_requested is None else first_requested.strftime("%Y-%m-%d"), synced_at),
+        )
+        self.stats["rows_fetched"] += len(data)
+
+    def _missing_ranges(self, symbol, start, meta, now, max_age):
+        if meta is None:
+            return [(start, None)], start
+
+        ranges = []
+        first_requested = meta["first_requested"]
+        stored = self._load(symbol)
+        if first_requested is not None and (start is None or start < first_requested):
+            ranges.append((start, first_requested if stored.empty else stored.index[0]))
+            first_requested = start
+        if now - meta["synced_at"] > max_age:
+            # Re-fetch from the last settled bar (the newest may still have been trading when stored),
+            # so _adjusted has an overlapping bar to compare.
+            ranges.append((None if stored.empty else stored.index[max(len(stored) - 2, 0)], None))
+        return ranges, first_requested
+
+    def _adjusted(self, symbol, data):
+        stored = self._load(symbol)
+        if len(stored) < 2 or stored.index[-2] not in data.index:
+            return False
+        anchor = stored.index[-2]
+        stored_close, fetched_close = stored.at[anchor, "Close"], data["Close"][data.index == anchor].iloc[-1]
+        return abs(fetched_close - stored_close) > ADJUSTMENT_TOLERANCE * abs(stored_close)
+
+    @timed()
+    def sync_many(self, symbols, start=None, max_age=None):
+        start = None if start is None else start - FETCH_MARGIN
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            now = time.time()
+            groups, first_requested = {}, {}
+            for symbol in dict.fromkeys(symbols):
+                ranges, first_requested[symbol] = self._missing_ranges(symbol, start, self._meta(symbol), now, max_age)
+                if ranges:
+                    groups.setdefault(tuple(ranges), []).append(symbol)
+                else:
+                    self.stats["hits"] += 1
+
+            # One transaction for the whole sync: committing per symbol made a cold sync of 500 tickers
+            # spend most of its time in fsync.
+            try:
+                rebase = {}
+                for ranges, group in groups.items():
+                    self.stats["misses"] += len(group)
+                    with span("provider fetch"):
+                        fetched = [fetch_many(self.source, group, range_start, range_end) for range_start, range_end in ranges]
+                    for symbol in group:
+                        data = pd.concat([frames[symbol] for frames in fetched])
+                        record_fetch(symbol, len(ranges), data)
+                        if self._adjusted(symbol, data):
+                            self._db.execute("DELETE FROM prices WHERE symbol = ?", (symbol,))
+                            self._frames[symbol] = empty_frame()
+                            rebase.setdefault(first_requested[symbol], []).append(symbol)
+                        else:
+                            self._store(symbol, data, first_requested[symbol], now)
+                # Symbols re-adjusted by the provider are fetched again over their whole requested range.
+                for since, group in rebase.items():
+                    with span("provider fetch"):
+                        fetched = fetch_many(self.source, group, since)
+                    for symbol in group:
+                        record_fetch(symbol, 1, fetched[symbol])
+                        self._store(symbol, fetched[symbol], since, now)
+            finally:
+                self._db.commit()
+
+            return {symbol: self._load(symbol) for symbol in symbols}
+
+    def sync(self, symbol, start=None):
+        return self.sync_many([symbol], start)[symbol]
+
+    def history_many(self, symbols, period="1y"):
+        start = period_start(period)
+        windows = {}
+        for symbol, frame in self.sync_many(symbols, start).items():
+            window = frame if start is None else frame[frame.index >= start]
+            windows[symbol] = (frame.iloc[-1:] if window.empty else window).copy()
+        return windows
+
+    def history(self, symbol, period="1y"):
+        return self.history_many([symbol], period)[symbol]
+
+    def quotes(self, symbols):
+        frames = self.sync_many(symbols, period_start("1d"), self.quote_max_age)
+        return {symbol: frame.iloc[-1] for symbol, frame in frames.items() if not frame.empty}
+
+    def report(self):
+        return f"Price cache: {self.stats['hits']} hits, {self.stats['misses']} misses, {self.stats['rows_fetched']} rows fetched"
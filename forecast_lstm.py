@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import tensorflow as tf
+from tensorflow.keras.models import Sequential, load_model
+from tensorflow.keras.layers import LSTM, Dense
+
+from instrument import timed
+from lstm_inference import (CACHE_DIR, FEATURES, HORIZON, WEIGHTS_FILE, WINDOW, cache_path, export_weights, load_cached,
+                            new_bars, predict, scale, trained_rows)
+
+EPOCHS = 10
+FINE_TUNE_EPOCHS = 3
+
+def set_threads(count):
+    tf.config.threading.set_intra_op_parallelism_threads(count)
+    tf.config.threading.set_inter_op_parallelism_threads(count)
+
+def fit_scaler(values):
+    data_min, data_max = values.min(axis=0), values.max(axis=0)
+    return {"min": data_min, "range": np.where(data_max > data_min, data_max - data_min, 1.0)}
+
+def make_windows(scaled, window, horizon=HORIZON):
+    # sliding_window_view returns read-only views, so no window is copied until Keras batches it.
+    count = len(scaled) - window - horizon + 1
+    if count <= 0:
+        raise ValueError(f"Need at least {window + horizon} bars for a {window}-bar window and {horizon}-bar horizon, got {len(scaled)}")
+    X = sliding_window_view(scaled, window, axis=0)[:count].transpose(0, 2, 1)
+    y = sliding_window_view(scaled[window:, 0], horizon)[:count]
+    return X, y
+
+def build_model(window, features, horizon=HORIZON):
+    model = Sequential()
+    model.add(LSTM(units=50, return_sequences=True, input_shape=(window, features)))
+    model.add(LSTM(units=50, return_sequences=False))
+    model.add(Dense(units=25))
+    model.add(Dense(units=horizon))
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+def load_keras(path):
+    return load_model(os.path.join(path, "model.keras"))
+
+def save_cached(name, window, horizon, model, meta, cache_dir=CACHE_DIR):
+    path = cache_path(name, window, horizon, cache_dir)
+    os.makedirs(path, exist_ok=True)
+    model.save(os.path.join(path, "model.keras"))
+    export_weights(model, os.path.join(path, WEIGHTS_FILE))
+    serializable = {"series": {
+        symbol: dict(series, scaler={key: value.tolist() for key, value in series["scaler"].items()})
+        for symbol, series in meta["series"].items()
+    }}
+    with open(os.path.join(path, "meta.json.tmp"), 'w') as file:
+        json.dump(serializable, file)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+def _series_values(frames):
+    return {symbol: frame[FEATURES].to_numpy(dtype=float) for symbol, frame in frames.items()}
+
+@timed()
+def train(frames, name=None, window=WINDOW, horizon=HORIZON, cache_dir=CACHE_DIR):
+    values = _series_values(frames)
+    cached = load_cached(name, window, horizon, cache_dir, load_keras) if name is not None else None
+
+    if cached is not None:
+        model, meta = cached
+        unseen = new_bars(meta, values, window, horizon)
+        if unseen is not None:
+            if unseen:
+                windows = [make_windows(scale(unseen[symbol], meta["series"][symbol]["scaler"]), window, horizon) for symbol in unseen]
+                model.fit(np.concatenate([X for X, _ in windows]), np.concatenate([y for _, y in windows]), epochs=FINE_TUNE_EPOCHS, batch_size=64)
+                for symbol, series_values in values.items():
+                    meta["series"][symbol].update(trained_rows(series_values))
+                save_cached(name, window, horizon, model, meta, cache_dir)
+            elif not os.path.exists(os.path.join(cache_path(name, window, horizon, cache_dir), WEIGHTS_FILE)):
+                # Models cached before the NumPy export existed.
+                export_weights(model, os.path.join(cache_path(name, window, horizon, cache_dir), WEIGHTS_FILE))
+            return model, {symbol: meta["series"][symbol]["scaler"] for symbol in values}
+
+    scalers = {symbol: fit_scaler(series_values) for symbol, series_values in values.items()}
+    windows = [make_windows(scale(values[symbol], scalers[symbol]), window, horizon) for symbol in values]
+    model = build_model(window, len(FEATURES), horizon)
+    model.fit(np.concatenate([X for X, _ in windows]), np.concatenate([y for _, y in windows]), epochs=EPOCHS, batch_size=64)
+    if name is not None:
+        meta = {"series": {
+            symbol: dict(trained_rows(series_values), scaler=scalers[symbol])
+            for symbol, series_values in values.items()
+        }}
+        save_cached(name, window, horizon, model, meta, cache_dir)
+    return model, scalers
+
+def forecast_many(frames, days=7, name=None, window=WINDOW, horizon=HORIZON, cache_dir=CACHE_DIR):
+    model, scalers = train(frames, name, window, horizon, cache_dir)
+    return predict(model, scalers, frames, days, window, horizon)
+
+def forecast(stock_data, days=7, symbol=None, window=WINDOW, horizon=HORIZON, cache_dir=CACHE_DIR):
+    return forecast_many({symbol: stock_data}, days, symbol, window, horizon, cache_dir)[symbol]
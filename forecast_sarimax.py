@@ -0,0 +1,74 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from instrument import timed
+
+CACHE_DIR = os.path.join("cache", "sarimax")
+TRAIN_WINDOW = 500
+EXOG_WINDOW = 20
+REFIT_EVERY = 5
+WARM_MAXITER = 50
+
+def future_exog(exog, days, strategy="mean", window=EXOG_WINDOW):
+    if strategy == "last":
+        return np.full((days, 1), exog[-1])
+    if strategy == "mean":
+        return np.full((days, 1), exog[-window:].mean())
+    raise ValueError(f"Unknown exog strategy: {strategy}")
+
+def params_path(symbol, order, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{symbol}_{'-'.join(map(str, order))}.json")
+
+def load_params(symbol, order, cache_dir=CACHE_DIR):
+    try:
+        with open(params_path(symbol, order, cache_dir), 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def save_params(symbol, order, params, last_date, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = params_path(symbol, order, cache_dir)
+    with open(f"{path}.tmp", 'w') as file:
+        json.dump({"params": list(params), "last_date": last_date.strftime('%Y-%m-%d')}, file)
+    os.replace(f"{path}.tmp", path)
+
+def volume_exog(stock_data):
+    # Raw IDX volumes are ~1e7 and leave the likelihood badly scaled; log volume keeps the optimizer well conditioned.
+    return np.log1p(stock_data['Volume'].to_numpy(dtype=float))
+
+@timed()
+def fit(stock_data, order=(1, 1, 1), symbol=None, window=TRAIN_WINDOW, use_exog=True, cache_dir=CACHE_DIR):
+    data = stock_data.iloc[-window:] if window else stock_data
+    exog = volume_exog(data) if use_exog else None
+    model = SARIMAX(data['Close'].to_numpy(dtype=float), order=order, exog=exog)
+
+    cached = load_params(symbol, order, cache_dir) if symbol is not None else None
+    if cached is None or len(cached["params"]) != len(model.start_params):
+        model_fit = model.fit(disp=False)
+    elif (data.index > pd.Timestamp(cached["last_date"])).sum() < REFIT_EVERY:
+        # Only a few bars since the last fit: keep the parameters and just run the filter over the window.
+        return model.filter(np.array(cached["params"]))
+    else:
+        # A bounded full refit, not results.append/extend: the window slides, so extending the old results
+        # would keep growing the sample past TRAIN_WINDOW. Starting from the cached parameters, the
+        # optimizer needs few of its WARM_MAXITER iterations.
+        model_fit = model.fit(start_params=np.array(cached["params"]), maxiter=WARM_MAXITER, disp=False)
+
+    if symbol is not None:
+        save_params(symbol, order, model_fit.params, data.index[-1], cache_dir)
+    return model_fit
+
+@timed()
+def forecast(stock_data, order=(1, 1, 1), exog_order=(1, 0, 1), days=7, symbol=None, window=TRAIN_WINDOW, exog_strategy="mean", cache_dir=CACHE_DIR):
+    use_exog = exog_strategy is not None
+    model_fit = fit(stock_data, order, symbol, window, use_exog, cache_dir)
+    exog = future_exog(volume_exog(stock_data), days, exog_strategy) if use_exog else None
+    predictions = model_fit.forecast(steps=days, exog=exog)
+
+    prediction_dates = pd.date_range(start=stock_data.index[-1] + pd.DateOffset(days=1), periods=days)
+    return pd.Series(np.asarray(predictions), index=prediction_dates, name='Close')
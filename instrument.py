@@ -0,0 +1,177 @@
+import atexit
+import contextlib
+import functools
+import os
+import threading
+import time
+
+PROFILE_ENV = "OPENIDX_PROFILE"
+PROFILE_MODES = ["tree", "cprofile"]
+PROFILE_DIR = "profiles"
+
+# The single active session, or None. Every hook below checks it first, so with profiling off an
+# instrumented call costs one global lookup.
+_session = None
+_NULL_SPAN = contextlib.nullcontext()
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.children = {}
+
+    def self_seconds(self):
+        return max(self.seconds - sum(child.seconds for child in self.children.values()), 0.0)
+
+class Session:
+    def __init__(self, mode="tree", directory=PROFILE_DIR):
+        self.mode = mode
+        self.directory = directory
+        self.root = Node("session")
+        self.tickers = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.profiler = None
+        if mode == "cprofile":
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _stack(self):
+        # Spans opened in worker threads (e.g. concurrent fetches) start from the session root.
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = [self.root]
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name):
+        stack = self._stack()
+        with self._lock:
+            node = stack[-1].children.setdefault(name, Node(name))
+        stack.append(node)
+        start = time.perf_counter()
+        try:
+            yield node
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                node.calls += 1
+                node.seconds += elapsed
+
+    def record_fetch(self, symbol, calls, frame):
+        size = int(frame.memory_usage(deep=True).sum())
+        with self._lock:
+            stats = self.tickers.setdefault(symbol, {"calls": 0, "rows": 0, "bytes": 0})
+            stats["calls"] += calls
+            stats["rows"] += len(frame)
+            stats["bytes"] += size
+
+    def _walk(self, node, depth=0, path=()):
+        path = path + (node.name,)
+        yield node, depth, path
+        for child in sorted(node.children.values(), key=lambda child: child.seconds, reverse=True):
+            yield from self._walk(child, depth + 1, path)
+
+    def report(self):
+        self.root.seconds, self.root.calls = time.perf_counter() - self.started, 1
+        lines = [f"{'Operation':<60}{'Calls':>8}{'Total (s)':>12}{'Self (s)':>12}{'Share':>8}"]
+        for node, depth, path in self._walk(self.root):
+            share = node.seconds / self.root.seconds if self.root.seconds else 0.0
+            lines.append(f"{'  ' * depth + node.name:<60}{node.calls:>8}{node.seconds:>12.3f}{node.self_seconds():>12.3f}{share:>8.1%}")
+        if self.tickers:
+            lines.append("")
+            lines.append(f"{'Ticker':<16}{'Provider Calls':>16}{'Rows':>10}{'Bytes':>14}")
+            for symbol, stats in sorted(self.tickers.items(), key=lambda item: item[1]["bytes"], reverse=True):
+                lines.append(f"{symbol:<16}{stats['calls']:>16}{stats['rows']:>10}{stats['bytes']:>14}")
+        return "\n".join(lines)
+
+    def folded(self):
+        # Brendan Gregg's folded-stack format (one "a;b;c microseconds" line per node, self time only),
+        # readable by flamegraph.pl and speedscope.
+        lines = []
+        for node, _, path in self._walk(self.root):
+            microseconds = int(node.self_seconds() * 1e6)
+            if microseconds:
+                lines.append(f"{';'.join(path)} {microseconds}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = {"tree": os.path.join(self.directory, f"{stamp}.txt"), "folded": os.path.join(self.directory, f"{stamp}.folded")}
+        with open(paths["tree"], 'w') as file:
+            file.write(self.report() + "\n")
+        with open(paths["folded"], 'w') as file:
+            file.write(self.folded())
+        if self.profiler is not None:
+            self.profiler.disable()
+            paths["cprofile"] = os.path.join(self.directory, f"{stamp}.prof")
+            self.profiler.dump_stats(paths["cprofile"])
+        return paths
+
+def profile_mode(value):
+    # Reads a --profile or OPENIDX_PROFILE value: unset, "" and "0" mean off, "1" means the timing tree.
+    if value in (None, "", "0"):
+        return None
+    if value == "1":
+        return "tree"
+    if value not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {value} (expected one of {', '.join(PROFILE_MODES)}, 1 or 0)")
+    return value
+
+def enable(mode="tree", directory=PROFILE_DIR):
+    global _session
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+    if _session is None:
+        _session = Session(mode, directory)
+        _instrument_rendering()
+        atexit.register(finish)
+    return _session
+
+def finish():
+    # Prints the timing tree and writes it, the folded stacks and any cProfile dump; safe to call twice.
+    global _session
+    session, _session = _session, None
+    if session is None:
+        return None
+    paths = session.dump()
+    print("\nProfile:")
+    print(session.report())
+    print(f"Written to {', '.join(paths.values())}")
+    return paths
+
+def span(name):
+    if _session is None:
+        return _NULL_SPAN
+    return _session.span(name)
+
+def timed(name=None):
+    def decorate(func):
+        label = name or (func.__qualname__ if func.__module__ == "__main__" else f"{func.__module__}.{func.__qualname__}")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _session is None:
+                return func(*args, **kwargs)
+            with _session.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def record_fetch(symbol, calls, frame):
+    if _session is not None:
+        _session.record_fetch(symbol, calls, frame)
+
+def _instrument_rendering():
+    # Table rendering happens inside print(), so it is wrapped only once profiling is switched on.
+    try:
+        from prettytable import PrettyTable
+    except ImportError:
+        return
+    if not hasattr(PrettyTable.get_string, "__wrapped__"):
+        PrettyTable.get_string = timed("PrettyTable.get_string")(PrettyTable.get_string)
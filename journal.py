@@ -0,0 +1,86 @@
+import json
+import os
+from datetime import datetime
+
+def write_atomic(path, data):
+    # Write to a temporary file in the same directory and rename it over the target, so a crash
+    # leaves either the old file or the new one, never a half-written one.
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+def journal_path(filename):
+    return f"{os.path.splitext(filename)[0]}.journal"
+
+class TradeJournal:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a')
+
+    def close(self):
+        self._file.close()
+
+    def append(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def read(self, after_seq=0):
+        entries, valid_bytes = [], 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                valid_bytes += len(line)
+                if entry["seq"] > after_seq:
+                    entries.append(entry)
+        # A crash mid-append can only leave the last line incomplete; cut it off so new entries start on a clean line.
+        if valid_bytes < os.path.getsize(self.path):
+            self._file.truncate(valid_bytes)
+        return entries
+
+    def truncate(self):
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+class LotBook:
+    def __init__(self, lots=None, realized=None):
+        self.lots = lots if lots is not None else {}
+        self.realized = realized if realized is not None else {}
+
+    def buy(self, item, quantity, price):
+        self.lots.setdefault(item, []).append([quantity, price])
+
+    def sell(self, item, quantity, price=None):
+        # Lots are consumed first-in, first-out; realized P&L is only booked when a sell price is known.
+        lots = self.lots.get(item, [])
+        while quantity > 0 and lots:
+            used = min(quantity, lots[0][0])
+            if price is not None:
+                self.realized[item] = self.realized.get(item, 0.0) + (price - lots[0][1]) * used * 100
+            lots[0][0] -= used
+            quantity -= used
+            if lots[0][0] == 0:
+                lots.pop(0)
+
+    def reset(self, item, quantity, price):
+        self.lots[item] = [[quantity, price]] if quantity > 0 else []
+
+    def remove(self, item):
+        self.lots.pop(item, None)
+
+    def fifo_cost(self, item):
+        lots = self.lots.get(item, [])
+        quantity = sum(lot[0] for lot in lots)
+        return sum(lot[0] * lot[1] for lot in lots) / quantity if quantity else 0.0
+
+def new_entry(seq, op, item, quantity=None, price=None):
+    return {"seq": seq, "op": op, "item": item, "quantity": quantity, "price": price, "timestamp": datetime.now().isoformat(timespec="seconds")}
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrument import timed
+
+# Everything here is NumPy-only, so forecasting with a cached model never imports TensorFlow.
+# forecast_lstm trains the model and writes weights.npz next to model.keras for this module to load.
+CACHE_DIR = os.path.join("cache", "models")
+WINDOW = 30
+HORIZON = 5
+FEATURES = ['Close', 'Volume']
+WEIGHTS_FILE = "weights.npz"
+# The price store overwrites its newest bars on every refresh: today's bar changes until the close and
+# providers revise recent sessions. Changes there are expected and only call for fine-tuning.
+REVISABLE_BARS = 10
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "relu": lambda x: np.maximum(x, 0),
+}
+
+def fingerprint(values):
+    return hashlib.sha1(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()
+
+def scale(values, scaler):
+    return (values - scaler["min"]) / scaler["range"]
+
+def unscale_close(values, scaler):
+    return np.asarray(values) * scaler["range"][0] + scaler["min"][0]
+
+def cache_path(name, window, horizon=HORIZON, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"{name}_w{window}_h{horizon}")
+
+def load_meta(path):
+    with open(os.path.join(path, "meta.json"), 'r') as file:
+        meta = json.load(file)
+    for series in meta["series"].values():
+        series["scaler"] = {key: np.array(value) for key, value in series["scaler"].items()}
+    return meta
+
+def trained_rows(values):
+    # What the cache records about the bars a model was trained on. The newest REVISABLE_BARS are
+    # fingerprinted on their own, so a revision there means fine-tuning rather than retraining.
+    stable = max(len(values) - REVISABLE_BARS, 0)
+    return {"rows": len(values), "stable_rows": stable, "fingerprint": fingerprint(values[:stable]),
+            "tail_fingerprint": fingerprint(values[stable:])}
+
+def new_bars(meta, values, window, horizon):
+    # Returns the slice of each series whose windows end in bars the cached model has not seen, or in
+    # recent trained bars that have since been revised. Returns None if any series was never trained
+    # on or an older trained bar has changed.
+    bars = {}
+    for symbol, series_values in values.items():
+        series = meta["series"].get(symbol)
+        if series is None:
+            return None
+        rows = series["rows"]
+        # Caches written before the revisable tail existed fingerprint every trained row.
+        stable = series.get("stable_rows", rows)
+        if not window + horizon <= rows <= len(series_values) or fingerprint(series_values[:stable]) != series["fingerprint"]:
+            return None
+        first_new = rows
+        if "tail_fingerprint" in series and fingerprint(series_values[stable:rows]) != series["tail_fingerprint"]:
+            first_new = stable
+        if first_new < len(series_values):
+            bars[symbol] = series_values[max(first_new - window - horizon + 1, 0):]
+    return bars
+
+def export_weights(model, path):
+    # Flattens a Sequential stack of LSTM and Dense layers into "{layer}/{weight}" arrays plus the
+    # per-layer settings the forward pass needs. Keras LSTM kernels keep the gates in i, f, c, o order.
+    arrays, kinds, activations, recurrent_activations, sequences = {}, [], [], [], []
+    for i, layer in enumerate(model.layers):
+        config = layer.get_config()
+        kind = type(layer).__name__
+        if kind not in ("LSTM", "Dense") or not config.get("use_bias", True):
+            raise ValueError(f"Cannot export layer {layer.name} ({kind})")
+        for activation in (config["activation"], config.get("recurrent_activation", "linear")):
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Cannot export activation {activation} of layer {layer.name}")
+        names = ["kernel", "recurrent_kernel", "bias"] if kind == "LSTM" else ["kernel", "bias"]
+        for weight, value in zip(names, layer.get_weights()):
+            arrays[f"{i}/{weight}"] = np.asarray(value, dtype=np.float32)
+        kinds.append(kind)
+        activations.append(config["activation"])
+        recurrent_activations.append(config.get("recurrent_activation", "linear"))
+        sequences.append(bool(config.get("return_sequences", False)))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", 'wb') as file:
+        np.savez(file, kinds=np.array(kinds), activations=np.array(activations),
+                 recurrent_activations=np.array(recurrent_activations), return_sequences=np.array(sequences), **arrays)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+class NumpyForecaster:
+    # Drop-in for the Keras model in predict(): called on a float32 batch (tickers, window, features)
+    # and returns (tickers, horizon). Every ticker goes through each time step in one matrix product.
+    def __init__(self, layers):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as weights:
+            layers = []
+            for i, kind in enumerate(weights["kinds"]):
+                layers.append({
+                    "kind": str(kind),
+                    "activation": ACTIVATIONS[str(weights["activations"][i])],
+                    "recurrent_activation": ACTIVATIONS[str(weights["recurrent_activations"][i])],
+                    "return_sequences": bool(weights["return_sequences"][i]),
+                    "kernel": weights[f"{i}/kernel"],
+                    "bias": weights[f"{i}/bias"],
+                    "recurrent_kernel": weights[f"{i}/recurrent_kernel"] if kind == "LSTM" else None,
+                })
+        return cls(layers)
+
+    @staticmethod
+    def _lstm(x, layer):
+        batch, steps, _ = x.shape
+        units = layer["recurrent_kernel"].shape[0]
+        activation, recurrent_activation = layer["activation"], layer["recurrent_activation"]
+        # The input projection does not depend on the state, so it is one product over all steps.
+        projected = x @ layer["kernel"] + layer["bias"]
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if layer["return_sequences"] else None
+        for t in range(steps):
+            z = projected[:, t] + h @ layer["recurrent_kernel"]
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * activation(z[:, 2 * units:3 * units])
+            h = o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+    def __call__(self, x, training=False):
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            if layer["kind"] == "LSTM":
+                x = self._lstm(x, layer)
+            else:
+                x = layer["activation"](x @ layer["kernel"] + layer["bias"])
+        return x
+
+def load_weights(path):
+    return NumpyForecaster.load(os.path.join(path, WEIGHTS_FILE))
+
+def load_cached(name, window=WINDOW, horizon=HORIZON, cache_dir=CACHE_DIR, loader=load_weights):
+    # loader turns the cache directory into a model: the NumPy export here, model.keras in forecast_lstm.
+    path = cache_path(name, window, horizon, cache_dir)
+    try:
+        meta = load_meta(path)
+        model = loader(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return model, meta
+
+@timed()
+def predict(model, scalers, frames, days, window=WINDOW, horizon=HORIZON):
+    symbols = list(frames)
+    steps = -(-days // horizon)
+
+    # One buffer holds every ticker's input window followed by the forecast, so each step is a
+    # single batched model call over all tickers and nothing is re-allocated between steps.
+    buffer = np.empty((len(symbols), window + steps * horizon, len(FEATURES)), dtype=np.float32)
+    for i, symbol in enumerate(symbols):
+        buffer[i, :window] = scale(frames[symbol][FEATURES].to_numpy(dtype=float)[-window:], scalers[symbol])
+    # Future volume is unknown; hold the last observed volume.
+    buffer[:, window:, 1] = buffer[:, window - 1:window, 1]
+
+    for step in range(steps):
+        start = step * horizon
+        buffer[:, start + window:start + window + horizon, 0] = np.asarray(model(buffer[:, start:start + window], training=False))
+
+    forecasts = {}
+    for i, symbol in enumerate(symbols):
+        index = pd.date_range(start=frames[symbol].index[-1] + pd.DateOffset(days=1), periods=days)
+        forecasts[symbol] = pd.Series(unscale_close(buffer[i, window:window + days, 0], scalers[symbol]), index=index, name='Close')
+    return forecasts
+
+def forecast_many(frames, days=7, name=None, window=WINDOW, horizon=HORIZON, cache_dir=CACHE_DIR):
+    # Returns None unless the cached model was trained on exactly these bars; forecast_lstm would
+    # fine-tune it first, so its forecast is the one to use then.
+    cached = load_cached(name, window, horizon, cache_dir) if name is not None else None
+    if cached is None:
+        return None
+    model, meta = cached
+    if new_bars(meta, {symbol: frame[FEATURES].to_numpy(dtype=float) for symbol, frame in frames.items()}, window, horizon) != {}:
+        return None
+    return predict(model, {symbol: meta["series"][symbol]["scaler"] for symbol in frames}, frames, days, window, horizon)
+
+def forecast(stock_data, days=7, symbol=None, window=WINDOW, horizon=HORIZON, cache_dir=CACHE_DIR):
+    forecasts = forecast_many({symbol: stock_data}, days, symbol, window, horizon, cache_dir)
+    return forecasts[symbol] if forecasts is not None else None
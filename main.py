@@ -1,115 +1,128 @@
 import os
 import json
+import asyncio
+import argparse
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import yfinance as yf
 from prettytable import PrettyTable
 from colorama import Fore, Style
-import statsmodels.api as sm
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-
-def get_max_gain(price, input_str, board):
-    if price <= 50 and board != 3:
-        return 0.0
-    elif input_str.upper() == "ARA":
-        if board in {0, 1, 2}:
-            if 50 <= price <= 200:
-                return 0.35
-            elif price <= 5000:
-                return 0.25
-            else:
-                return 0.20
-        elif board == 3:
-            return 0.1
-        else:
-            return -3
-    elif input_str.upper() == "ARB":
-        if board == 0:
-            return -0.07
-        elif board == 1:
-            return -0.15
-        elif board == 2:
-            if 50 <= price <= 200:
-                return -0.35
-            elif price <= 5000:
-                return -0.25
-            else:
-                return -0.20
-        elif board == 3:
-            return -0.1
-        else:
-            return -3
-    else:
-        return -3
-
-def ipo_warrant_bep(stock_price, board, warrant, stock):
-    board += 1
-    stock_lots = 10000.00
-    multiplier = warrant / stock
-
-    if board == 2:
-        max_gain = get_max_gain(stock_price, "ARB", board)
-        loss = stock_price + (stock_price * max_gain)
-    elif board == 3:
-        loss = stock_price - (stock_price * 0.10)
-
-    warrant_lots = multiplier * stock_lots
-    result, price = 0.0, 0.0
-    base_stock = stock_lots * stock_price * 100.00
-    base_loss = stock_lots * 100 * loss
-
-    while result <= 0.00:
-        price += 1
-        result = (base_loss + (price * warrant_lots * 100.00)) / base_stock - 1
 
-    return price, result
+from backends import get_backend
+from backtest import backtest
+from batch_forecast import run_batch
+from calculator import ipo_warrant_bep, ipo_warrant_bep_grid
+from datastore import PriceStore
+from instrument import PROFILE_ENV, PROFILE_MODES, enable, profile_mode, timed
+from journal import LotBook, TradeJournal, journal_path, new_entry, write_atomic
+from optimizer import PortfolioOptimizer, rebalance_trades
+from rolling import WINDOWS, RollingMetrics, rolling_metrics
+from risk import VAR_METHODS, VAR_SEED, RiskEngine, price_matrix, returns_matrix, value_at_risk, var_breakdown
+from screener import Screener, load_universe
+from simulation import simulate_ara_arb, summarize_simulation
+from watch import PortfolioWatcher
 
 class PortofolioManager:
-    def __init__(self):
+    def __init__(self, store=None, compact_every=500):
         self.stock = {}
-
-    def save_to_file(self, filename):
-        with open(filename, 'w') as file:
-            json.dump(self.stock, file)
+        self.store = store if store is not None else PriceStore()
+        self.book = LotBook()
+        self.journal = None
+        self.filename = None
+        self.seq = 0
+        self.snapshot_seq = 0
+        self.compact_every = compact_every
+
+    def _snapshot(self):
+        return {"version": 2, "seq": self.seq, "stock": self.stock, "lots": self.book.lots, "realized": self.book.realized}
+
+    def _apply(self, entry):
+        item, quantity, price = entry["item"], entry["quantity"], entry["price"]
+        if entry["op"] == "buy":
+            if item in self.stock:
+                existing_quantity = self.stock[item]['quantity']
+                total_quantity = existing_quantity + quantity
+                self.stock[item]['price'] = (existing_quantity * self.stock[item]['price'] + quantity * price) / total_quantity
+                self.stock[item]['quantity'] = total_quantity
+            else:
+                self.stock[item] = {'quantity': quantity, 'price': price}
+            self.book.buy(item, quantity, price)
+        elif entry["op"] == "sell":
+            self.stock[item]['quantity'] -= quantity
+            self.book.sell(item, quantity, price)
+        elif entry["op"] == "set":
+            self.stock[item] = {'quantity': quantity, 'price': price}
+            self.book.reset(item, quantity, price)
+        elif entry["op"] == "delete":
+            del self.stock[item]
+            self.book.remove(item)
+        self.seq = entry["seq"]
+
+    def _record(self, op, item, quantity=None, price=None):
+        entry = new_entry(self.seq + 1, op, item, quantity, price)
+        self._apply(entry)
+        if self.journal is not None:
+            self.journal.append(entry)
+
+    def save_to_file(self, filename, compact=False):
+        # Trades are already durable in the journal; the snapshot is only rewritten when the
+        # journal tail grows past compact_every entries, or when asked to.
+        if self.journal is not None and filename == self.filename:
+            if not compact and self.seq - self.snapshot_seq < self.compact_every:
+                return
+            write_atomic(filename, self._snapshot())
+            self.journal.truncate()
+            self.snapshot_seq = self.seq
+        else:
+            write_atomic(filename, self._snapshot())
 
     def load_from_file(self, filename):
         if os.path.exists(filename):
             try:
                 with open(filename, 'r') as file:
-                    self.stock = json.load(file)
+                    data = json.load(file)
             except json.JSONDecodeError:
                 print(f"Error decoding JSON from {filename}. Starting with an empty stock.")
+                data = {}
+            if data.get("version") == 2:
+                self.stock = data["stock"]
+                self.book = LotBook(data["lots"], data["realized"])
+                self.seq = data["seq"]
+            else:
+                self.stock = data
+                self.book = LotBook({item: [[info['quantity'], info['price']]] for item, info in data.items()})
         else:
             print(f"File not found: {filename}. Creating a new file.")
-            self.save_to_file(filename)
+            write_atomic(filename, self._snapshot())
+
+        self.filename = filename
+        self.snapshot_seq = self.seq
+        self.journal = TradeJournal(journal_path(filename))
+        for entry in self.journal.read(after_seq=self.seq):
+            self._apply(entry)
 
     def get_all_stocks(self):
         return self.stock.copy()
 
+    def get_lots(self, item):
+        return [list(lot) for lot in self.book.lots.get(item, [])]
+
+    def get_realized_profit_loss(self):
+        return self.book.realized.copy()
+
     def add_stock(self, item, quantity, price):
             if item in self.stock:
-                existing_quantity = self.stock[item]['quantity']
-                existing_price = self.stock[item]['price']
-                total_quantity = existing_quantity + quantity
-                weighted_average_price = (existing_quantity * existing_price + quantity * price) / total_quantity
-
-                self.stock[item]['quantity'] = total_quantity
-                self.stock[item]['price'] = weighted_average_price
+                self._record("buy", item, quantity, price)
+                total_quantity = self.stock[item]['quantity']
+                weighted_average_price = self.stock[item]['price']
                 print(f"{quantity} units of {item} added to stock at Rp{price} per unit. Total: {total_quantity} units. Weighted Average Price: Rp{weighted_average_price:.2f}")
 
             else:
-                self.stock[item] = {'quantity': quantity, 'price': price}
+                self._record("buy", item, quantity, price)
                 print(f"{quantity} units of {item} added to stock at Rp{price} per unit. Total: {quantity} units.")
 
-    def remove_stock(self, item, quantity):
+    def remove_stock(self, item, quantity, price=None):
         if item in self.stock:
             if self.stock[item]['quantity'] >= quantity:
-                self.stock[item]['quantity'] -= quantity
+                self._record("sell", item, quantity, price)
                 print(f"{quantity} units of {item} removed from stock. Remaining: {self.stock[item]['quantity']} units.")
             else:
                 print(f"Error: Insufficient stock for {item}.")
@@ -121,15 +134,14 @@ class PortofolioManager:
 
     def update_stock(self, item, new_quantity, new_price):
         if item in self.stock:
-            self.stock[item]['quantity'] = new_quantity
-            self.stock[item]['price'] = new_price
+            self._record("set", item, new_quantity, new_price)
             print(f"Stock information for {item} updated to {new_quantity} units at Rp{new_price} per unit.")
         else:
             print(f"Error: {item} not found in stock.")
 
     def delete_stock(self, item):
         if item in self.stock:
-            del self.stock[item]
+            self._record("delete", item)
             print(f"{item} removed from stock.")
         else:
             print(f"Error: {item} not found in stock.")
@@ -142,9 +154,14 @@ class PortofolioManager:
         table = PrettyTable()
         table.field_names = ["Stock Code", "Quantity", "Price Bought (Rp)", "Market Price", "Market Value (Rp)", "Profit/Loss (Rp)", "Percentage Change (%)"]
 
+        quotes = self.store.quotes([f"{item}.JK" for item in self.stock])
+
         for item, info in self.stock.items():
-            stock_data = yf.Ticker(f"{item}.JK")
-            market_price = stock_data.history(period="1d")["Close"][0]
+            quote = quotes.get(f"{item}.JK")
+            if quote is None:
+                print(f"No data found for {item}. Skipping.")
+                continue
+            market_price = quote["Close"]
             market_value = market_price * info['quantity'] * 100
             profit_loss = market_value - (info['price'] * info['quantity'] * 100)
             percentage_change = ((market_price - info['price']) / info['price']) * 100 if info['price'] != 0 else 0
@@ -156,12 +173,16 @@ class PortofolioManager:
 
         print("\nCurrent Stock:")
         print(table)
-        print( f"Last updated: {stock_data.history(period='1d').index[-1].strftime('%Y-%m-%d')}")
+        if quotes:
+            print(f"Last updated: {max(quote.name for quote in quotes.values()).strftime('%Y-%m-%d')}")
 
 class PortofolioAnalysis:
     def __init__(self, stock_manager):
         self.stock_manager = stock_manager
+        self.store = stock_manager.store
+        self.risk_engine = RiskEngine(self.store)
 
+    @timed()
     def overall_portfolio_performance(self):
         stocks = self.stock_manager.get_all_stocks()
 
@@ -175,9 +196,14 @@ class PortofolioAnalysis:
         total_investment = 0
         total_market_value = 0
 
+        quotes = self.store.quotes([f"{item}.JK" for item in stocks])
+
         for item, info in stocks.items():
-            stock_data = yf.Ticker(f"{item}.JK")
-            market_price = stock_data.history(period="1d")["Close"][0]
+            quote = quotes.get(f"{item}.JK")
+            if quote is None:
+                print(f"No data found for {item}. Skipping.")
+                continue
+            market_price = quote["Close"]
             market_value = market_price * info['quantity'] * 100
             total_investment += info['price'] * info['quantity'] * 100
             total_market_value += market_value
@@ -194,52 +220,23 @@ class PortofolioAnalysis:
 
         print("\nOverall Portfolio Performance:")
         print(table)
-        print(f"Last updated: {stock_data.history(period='1d').index[-1].strftime('%Y-%m-%d')}")
+        if quotes:
+            print(f"Last updated: {max(quote.name for quote in quotes.values()).strftime('%Y-%m-%d')}")
 
+    @timed()
     def calculate_volatility(self, item):
-        lookback_period=252
-        stock_data = yf.Ticker(f"{item}.JK")
-        historical_prices = stock_data.history(period=f"{lookback_period}d")["Close"]
-        daily_returns = historical_prices.pct_change().dropna()
-
-        volatility = daily_returns.std() * (252 ** 0.5) 
-        return volatility
+        return self.risk_engine.metrics([f"{item}.JK"])["volatility"].iloc[0]
 
+    @timed()
     def calculate_beta(self, item):
-        stock_data = yf.Ticker(f"{item}.JK")
-        historical_prices = stock_data.history(period="1y")["Close"]
-        daily_returns = historical_prices.pct_change().dropna()
-
-        idx_data = yf.Ticker("^JKSE")
-        idx_historical_prices = idx_data.history(period="1y")["Close"]
-        idx_daily_returns = idx_historical_prices.pct_change().dropna()
-
-        covariance = daily_returns.cov(idx_daily_returns)
-        variance = idx_daily_returns.var()
-        beta = covariance / variance
-        return beta
+        return self.risk_engine.metrics([f"{item}.JK"])["beta"].iloc[0]
 
+    @timed()
     def calculate_alpha(self, item):
-        stock_data = yf.Ticker(f"{item}.JK")
-        historical_prices = stock_data.history(period="1y")["Close"]
-        
-        idx_data = yf.Ticker('^JKSE')
-        idx_historical_prices = idx_data.history(period="1y")["Close"]
-        
-        data = pd.concat([historical_prices, idx_historical_prices], axis=1, keys=['Stock', 'Market'])
-        data['StockReturns'] = data['Stock'].pct_change()
-        data['MarketReturns'] = data['Market'].pct_change()
-        data = data.dropna()
-        
-        df = pd.DataFrame({'Returns': data['StockReturns'], 'MarketReturns': data['MarketReturns']})
-        df = sm.add_constant(df)
-        
-        model = sm.OLS(df['Returns'], df[['const', 'MarketReturns']])
-        results = model.fit()
-
-        alpha = round(results.params['const'], 2)
+        alpha = round(self.risk_engine.metrics([f"{item}.JK"])["alpha"].iloc[0], 2)
         return alpha
 
+    @timed()
     def calculate_sharpe_ratio(self, risk_free_rate=0):
         stocks = self.stock_manager.get_all_stocks()
 
@@ -247,18 +244,12 @@ class PortofolioAnalysis:
             print("No stock found.")
             return
 
-        individual_sharpe_ratios = {}
-
-        for item, info in stocks.items():
-            stock_data = yf.Ticker(f"{item}.JK").history(period="1y")["Close"]
-            stock_returns = (stock_data / stock_data.shift(1) - 1).dropna()
-            avg_stock_return = stock_returns.mean()
-            std_stock_return = stock_returns.std()
-            sharpe_ratio = (avg_stock_return - risk_free_rate) / std_stock_return
-            individual_sharpe_ratios[item] = sharpe_ratio
+        sharpe_ratios = self.risk_engine.metrics([f"{item}.JK" for item in stocks], risk_free_rate)["sharpe"]
+        individual_sharpe_ratios = {item: sharpe_ratios[f"{item}.JK"] for item in stocks}
 
         return individual_sharpe_ratios
 
+    @timed()
     def display_risk_metrics(self):
         stocks = self.stock_manager.get_all_stocks()
 
@@ -267,102 +258,234 @@ class PortofolioAnalysis:
             return
 
         table = PrettyTable()
-        table.field_names = ["Stock", "Volatility", "Alpha", "Beta", "Sharpe Ratio"]
-        table.min_width["Stock"] = 12
-        table.min_width["Volatility"] = 12
-        table.min_width["Alpha"] = 12
-        table.min_width["Beta"] = 12
-        table.min_width["Sharpe Ratio"] = 12
+        table.field_names = ["Stock", "Volatility", "Alpha", "Beta", "Sharpe Ratio", "Sortino Ratio", "Max Drawdown"]
+        for field in table.field_names:
+            table.min_width[field] = 12
 
         color_volatility = lambda x: Fore.GREEN if x <= 0.33 else Fore.YELLOW if x <= 0.66 else Fore.RED
         color_alpha = lambda x: Fore.GREEN if x > 0 else Fore.YELLOW if x == 0 else Fore.RED
         color_beta = lambda x: Fore.GREEN if x == 1 else Fore.YELLOW if x <= 1 else Fore.RED
         color_sharpe = lambda x: Fore.GREEN if x >= 1 else Fore.YELLOW if x >= 0 else Fore.RED
+        color_drawdown = lambda x: Fore.GREEN if x >= -0.2 else Fore.YELLOW if x >= -0.4 else Fore.RED
 
-        last_updated_date = None  # Initialize outside the loop
+        prices = price_matrix(self.store, [f"{item}.JK" for item in stocks] + [self.risk_engine.benchmark], self.risk_engine.period)
+        metrics = self.risk_engine.compute(prices)
 
-        for item, info in stocks.items():
-            volatility = self.calculate_volatility(item)
-            alpha = self.calculate_alpha(item)
-            beta = self.calculate_beta(item)
-            sharpe = self.calculate_sharpe_ratio()[item] 
+        for item in stocks:
+            row = metrics.loc[f"{item}.JK"]
+            volatility, beta, sharpe, sortino, drawdown = row["volatility"], row["beta"], row["sharpe"], row["sortino"], row["max_drawdown"]
+            alpha = round(row["alpha"], 2)
 
             table.add_row([item, f"{color_volatility(volatility)}{volatility:.2f}{Style.RESET_ALL}", f"{color_alpha(alpha)}{alpha:.2f}{Style.RESET_ALL}", \
-                f"{color_beta(beta)}{beta:.2f}{Style.RESET_ALL}", f"{color_sharpe(sharpe)}{sharpe:.2f}{Style.RESET_ALL}"])
+                f"{color_beta(beta)}{beta:.2f}{Style.RESET_ALL}", f"{color_sharpe(sharpe)}{sharpe:.2f}{Style.RESET_ALL}", \
+                f"{color_sharpe(sortino)}{sortino:.2f}{Style.RESET_ALL}", f"{color_drawdown(drawdown)}{drawdown:.2%}{Style.RESET_ALL}"])
 
-            stock_data = yf.Ticker(f"{item}.JK")
-            last_updated_date = stock_data.history(period='1d').index[-1].strftime('%Y-%m-%d')
+        last_updated_date = prices.drop(columns=self.risk_engine.benchmark).dropna(how="all").index[-1].strftime('%Y-%m-%d')
 
         print("\nRisk Metrics:")
         print(table)
         print("All annualized, relative to IHSG.")
         print(f"Last updated: {last_updated_date}")
 
+    @timed()
+    def display_value_at_risk(self, confidence=0.95, horizon=1, n_scenarios=1_000_000, seed=VAR_SEED):
+        stocks = self.stock_manager.get_all_stocks()
+
+        if not stocks:
+            print("No stock found.")
+            return
+
+        symbols = [f"{item}.JK" for item in stocks]
+        quotes = self.store.quotes(symbols)
+        symbols = [symbol for symbol in symbols if symbol in quotes]
+        if not symbols:
+            print("No stock with price data found.")
+            return
+
+        exposures = [quotes[symbol]["Close"] * stocks[symbol[:-3]]['quantity'] * 100 for symbol in symbols]
+        returns = returns_matrix(price_matrix(self.store, symbols, self.risk_engine.period))
+
+        table = PrettyTable()
+        table.field_names = ["Method", f"VaR {confidence:.0%} (Rp)", f"CVaR {confidence:.0%} (Rp)"]
+        errors = []
+        for method in VAR_METHODS:
+            try:
+                var, cvar = value_at_risk(returns, exposures, confidence, horizon, method, n_scenarios, seed=seed)
+            except ValueError as error:
+                errors.append(f"{method.replace('_', ' ').title()}: {error}")
+                table.add_row([method.replace("_", " ").title(), "-", "-"])
+                continue
+            table.add_row([method.replace("_", " ").title(), f"{var:.2f}", f"{cvar:.2f}"])
+
+        print(f"\nPortfolio Value-at-Risk ({horizon}-day horizon):")
+        print(table)
+        for error in errors:
+            print(error)
+
+        try:
+            breakdown = var_breakdown(returns, exposures, confidence, horizon)
+        except ValueError as error:
+            print(f"\nParametric VaR Breakdown unavailable: {error}")
+            return
+        breakdown_table = PrettyTable()
+        breakdown_table.field_names = ["Stock", "Exposure (Rp)", "Weight", "Marginal VaR", "Component VaR (Rp)", "Contribution"]
+        for symbol, row in breakdown.iterrows():
+            color = Fore.RED if row["contribution"] > row["weight"] else Fore.GREEN
+            breakdown_table.add_row([symbol[:-3], f"{row['exposure']:.2f}", f"{row['weight']:.2%}", f"{row['marginal_var']:.4f}",
+                f"{row['component_var']:.2f}", f"{color}{row['contribution']:.2%}{Style.RESET_ALL}"])
+
+        print("\nParametric VaR Breakdown:")
+        print(breakdown_table)
+        print("Losses are positive numbers. Red contributions exceed the holding's portfolio weight.")
+
+    @timed()
+    def display_rolling_metrics(self, windows=WINDOWS, period="2y"):
+        stocks = self.stock_manager.get_all_stocks()
+
+        if not stocks:
+            print("No stock found.")
+            return
+
+        prices = price_matrix(self.store, [f"{item}.JK" for item in stocks] + [self.risk_engine.benchmark], period)
+        series = rolling_metrics(prices, self.risk_engine.benchmark, windows)
+
+        table = PrettyTable()
+        table.field_names = ["Stock", "Window", "Volatility", "Beta", "Beta Change", "Alpha", "Correlation"]
+        for item in stocks:
+            for window in windows:
+                metrics = series[window].xs(f"{item}.JK", axis=1, level=1)
+                latest = metrics.iloc[-1]
+                # Change against the window before this one, to flag regime shifts.
+                beta_change = latest["beta"] - metrics["beta"].iloc[-1 - window] if len(metrics) > window else float("nan")
+                color = Fore.RED if abs(beta_change) >= 0.5 else Fore.YELLOW if abs(beta_change) >= 0.2 else Fore.GREEN
+                table.add_row([item, f"{window}d", f"{latest['volatility']:.2f}", f"{latest['beta']:.2f}", f"{color}{beta_change:+.2f}{Style.RESET_ALL}",
+                    f"{latest['alpha']:.4f}", f"{latest['correlation']:.2f}"])
+
+        print("\nRolling Risk Metrics:")
+        print(table)
+        print("Volatility annualized, alpha daily, relative to IHSG. Beta change is against the previous window.")
+        print(f"Last updated: {prices.index[-1].strftime('%Y-%m-%d')}")
+
+    @timed()
+    def display_screen(self, universe_path="universe.txt", query=None, sort_by="sharpe", top=20):
+        try:
+            universe = load_universe(universe_path)
+        except OSError:
+            print(f"Universe file not found: {universe_path}. It should list one IDX ticker per line.")
+            return
+
+        screener = Screener()
+        print(f"Syncing {len(universe)} tickers, only new trading days are downloaded after the first run...")
+        screener.sync(universe)
+        try:
+            results = screener.screen(query, sort_by, top=top)
+        except Exception as e:
+            print(f"Invalid screen: {e}")
+            return
+
+        table = PrettyTable()
+        table.field_names = ["Stock", "Last Close", "Volatility", "Beta", "Alpha", "Sharpe Ratio", "1M Return", "3M Return", "1Y Return", "Avg Value (Rp)"]
+        for item, row in results.iterrows():
+            color = Fore.GREEN if row["return_1y"] >= 0 else Fore.RED
+            table.add_row([item, f"{row['last_close']:.2f}", f"{row['volatility']:.2f}", f"{row['beta']:.2f}", f"{row['alpha']:.4f}", f"{row['sharpe']:.2f}",
+                f"{row['return_1m']:.2%}", f"{row['return_3m']:.2%}", f"{color}{row['return_1y']:.2%}{Style.RESET_ALL}", f"{row['avg_value']:.0f}"])
+
+        print(f"\nIDX Screener ({len(results)} matches, ranked by {sort_by}):")
+        print(table)
+        print(f"Columns available to filter and rank: {', '.join(results.columns)}")
+
+    @timed()
+    def display_optimal_weights(self, risk_free_rate=0):
+        stocks = self.stock_manager.get_all_stocks()
+
+        if not stocks:
+            print("No stock found.")
+            return
+
+        symbols = [f"{item}.JK" for item in stocks]
+        quotes = self.store.quotes(symbols)
+        symbols = [symbol for symbol in symbols if symbol in quotes]
+        if len(symbols) < 2:
+            print("At least two stocks with price data are needed to optimize weights.")
+            return
+
+        returns = returns_matrix(price_matrix(self.store, symbols, self.risk_engine.period)).dropna()
+        optimizer = PortfolioOptimizer(returns, risk_free_rate)
+        points, _ = optimizer.frontier(10)
+        min_variance, max_sharpe = optimizer.min_variance(), optimizer.max_sharpe()
+
+        quantities = {f"{item}.JK": info['quantity'] for item, info in stocks.items()}
+        prices = {symbol: quotes[symbol]["Close"] for symbol in symbols}
+        values = {symbol: prices[symbol] * quantities[symbol] * 100 for symbol in symbols}
+        total_value = sum(values.values())
+        current = optimizer.describe([values[symbol] / total_value for symbol in symbols])
+
+        frontier_table = PrettyTable()
+        frontier_table.field_names = ["Portfolio", "Return", "Volatility", "Sharpe Ratio"]
+        for label, row in [("Current", current), ("Min Variance", optimizer.describe(min_variance)), ("Max Sharpe", optimizer.describe(max_sharpe))]:
+            frontier_table.add_row([label, f"{row['return']:.2%}", f"{row['volatility']:.2%}", f"{row['sharpe']:.2f}"])
+        for i, row in points.iterrows():
+            frontier_table.add_row([f"Frontier {i + 1}", f"{row['return']:.2%}", f"{row['volatility']:.2%}", f"{row['sharpe']:.2f}"])
+
+        trades = rebalance_trades(max_sharpe, quantities, prices)
+        weights_table = PrettyTable()
+        weights_table.field_names = ["Stock", "Current Weight", "Min Variance", "Max Sharpe", "Current Lots", "Target Lots", "Trade Lots", "Trade Value (Rp)"]
+        for symbol in symbols:
+            row = trades.loc[symbol]
+            color = Fore.GREEN if row["trade_lots"] > 0 else Fore.RED if row["trade_lots"] < 0 else ""
+            weights_table.add_row([symbol[:-3], f"{values[symbol] / total_value:.2%}", f"{min_variance[symbol]:.2%}", f"{max_sharpe[symbol]:.2%}",
+                f"{row['current_lots']:.0f}", f"{row['target_lots']:.0f}", f"{color}{row['trade_lots']:+.0f}{Style.RESET_ALL}", f"{row['trade_value']:.2f}"])
+
+        print("\nEfficient Frontier (annualized):")
+        print(frontier_table)
+        print("\nOptimal Weights and Rebalancing Towards Max Sharpe:")
+        print(weights_table)
+        print("Target lots are rounded down to whole 100-share lots, so the rebalanced portfolio never exceeds its current value.")
+
 class QuantitativeAnalysis:
-    def __init__(self, symbol):
+    @timed()
+    def __init__(self, symbol, store=None, chart_dir="charts"):
         self.symbol = symbol
-        self.stock_data = yf.download(f"{symbol}.JK", progress=False)
+        self.store = store if store is not None else PriceStore()
+        self.chart_dir = chart_dir
+        self.stock_data = self.store.history(f"{symbol}.JK", period="max")
+
+    def _save_chart(self, forecast, model, title, *style):
+        os.makedirs(self.chart_dir, exist_ok=True)
+        path = get_backend("plot").save_forecast(self.stock_data['Close'], forecast, title, os.path.join(self.chart_dir, f"{self.symbol}_{model}.png"), *style)
+        print(f"Chart saved to {path}")
 
+    @timed()
     def sarimax_forecast(self, order=(1, 1, 1), exog_order=(1, 0, 1), days=7):
-        ts = self.stock_data['Close']
-        exog = self.stock_data['Volume']
-
-        model = SARIMAX(ts, order=order, exog=exog, exog_order=exog_order)
-        model_fit = model.fit()
-        predictions = model_fit.predict(start=len(ts), end=len(ts) + days - 1, exog=exog[-days:])
-
-        plt.plot(ts, label='Actual')
-        plt.xlim(ts.index[0], ts.index[-1] + pd.DateOffset(days=len(predictions)))
-        prediction_dates = pd.date_range(start=ts.index[-1] + pd.DateOffset(days=1), periods=len(predictions))
-        plt.plot(prediction_dates, predictions, label='Predicted')
-        plt.xlabel('Date')
-        plt.ylabel('Stock Price')
-        plt.title(f'{self.symbol} Stock Price - Actual vs Predicted (SARIMAX)')
-        plt.legend()
-        plt.show()
+        predictions = get_backend("sarimax").forecast(self.stock_data, order, exog_order, days, symbol=self.symbol)
+        self._save_chart(predictions, "sarimax", f'{self.symbol} Stock Price - Actual vs Predicted (SARIMAX)')
 
+    @timed()
     def lstm_forecast(self, days=7):
-        ts_close = self.stock_data['Close'].values.reshape(-1, 1)
-        ts_volume = self.stock_data['Volume'].values.reshape(-1, 1)
-        scaler_close = MinMaxScaler(feature_range=(0, 1))
-        scaler_volume = MinMaxScaler(feature_range=(0, 1))
-        ts_close_scaled = scaler_close.fit_transform(ts_close)
-        ts_volume_scaled = scaler_volume.fit_transform(ts_volume)
-        ts_combined = np.concatenate((ts_close_scaled, ts_volume_scaled), axis=1)
-
-        X, y = [], []
-        for i in range(len(ts_combined) - 30):
-            X.append(ts_combined[i:i+30, :])
-            y.append(ts_close_scaled[i+30, 0])
-        X, y = np.array(X), np.array(y)
-        X = np.reshape(X, (X.shape[0], X.shape[1], X.shape[2]))
-
-        model = Sequential()
-        model.add(LSTM(units=50, return_sequences=True, input_shape=(X.shape[1], X.shape[2])))
-        model.add(LSTM(units=50, return_sequences=False))
-        model.add(Dense(units=25))
-        model.add(Dense(units=1))
-        model.compile(optimizer='adam', loss='mean_squared_error')
-        model.fit(X, y, epochs=10, batch_size=64)
-
-        inputs = ts_combined[-30:]
-        forecast = []
-        for i in range(days):
-            input_sequence = inputs[-30:]
-            input_sequence = np.reshape(input_sequence, (1, 30, X.shape[2]))
-            prediction = model.predict(input_sequence)
-            inputs = np.append(inputs, np.concatenate((prediction, np.random.rand(1, 1)), axis=1), axis=0)
-            forecast.append(prediction[0, 0])
-        forecast = scaler_close.inverse_transform(np.array(forecast).reshape(-1, 1))
-
-        plt.plot(self.stock_data['Close'].index, self.stock_data['Close'], label='Actual')
-        forecast_index = pd.date_range(start=self.stock_data.index[-1] + pd.DateOffset(days=1), periods=days)
-        plt.plot(forecast_index, forecast, label='Forecasted', linestyle='dashed')
-        plt.xlabel('Date')
-        plt.ylabel('Stock Price')
-        plt.title(f'{self.symbol} Stock Price - Actual vs Forecasted (LSTM)')
-        plt.legend()
-        plt.show()
+        # A model already trained on exactly these bars runs without loading TensorFlow.
+        forecast = get_backend("lstm_numpy").forecast(self.stock_data, days, symbol=self.symbol)
+        if forecast is None:
+            forecast = get_backend("lstm").forecast(self.stock_data, days, symbol=self.symbol)
+        self._save_chart(forecast, "lstm", f'{self.symbol} Stock Price - Actual vs Forecasted (LSTM)', 'Forecasted', 'dashed')
+
+    @timed()
+    def backtest_forecasts(self, horizon=5, mode="expanding"):
+        summary, _, info = backtest(self.symbol, self.stock_data, horizon=horizon, mode=mode)
+
+        table = PrettyTable()
+        table.field_names = ["Model", "Folds", "MAE (Rp)", "RMSE (Rp)", "Naive MAE (Rp)", "Naive RMSE (Rp)", "MAE Skill", "Direction Hit Rate"]
+        for model, row in summary.iterrows():
+            color = Fore.GREEN if row["mae_skill"] > 0 else Fore.RED
+            table.add_row([model.upper(), int(row["folds"]), f"{row['mae']:.2f}", f"{row['rmse']:.2f}", f"{row['naive_mae']:.2f}", f"{row['naive_rmse']:.2f}",
+                f"{color}{row['mae_skill']:.2%}{Style.RESET_ALL}", f"{row['directional_accuracy']:.2%}"])
+
+        print(f"\nWalk-forward Backtest for {self.symbol} ({mode} window, {horizon}-day horizon):")
+        print(table)
+        for model, errors in info["errors"].items():
+            for error in errors:
+                print(f"{model.upper()} failed: {error}")
+        print(f"Computed {int(summary['computed'].sum()) if not summary.empty else 0} new folds in {info['wall_time']:.1f}s; the rest came from the cache.")
+        print("Naive carries the last close forward. Skill above 0% means the model beats it.")
 
 def main():
     stock_manager = PortofolioManager()
@@ -396,7 +519,7 @@ def main():
             quit = False
 
             while not quit:
-                print("\n1. Add stock\n2. Remove stock\n3. Update stock\n4. Delete stock\n5. Display portfolio\n6. Return")
+                print("\n1. Add stock\n2. Remove stock\n3. Update stock\n4. Delete stock\n5. Display portfolio\n6. Watch portfolio (live)\n7. Return")
                 choice = input("Enter your choice: ")
 
                 if choice == "1":
@@ -405,7 +528,7 @@ def main():
                         quantity = int(input("Enter quantity in lots to add: "))
                         price = float(input("Enter price per unit: "))
                         try:
-                            market_price = yf.Ticker(f"{item}.JK").history(period="1d")["Close"][0]
+                            market_price = stock_manager.store.history(f"{item}.JK", period="1d")["Close"].iloc[-1]
                         except IndexError:
                             print(f"No data found for {item}. Skipping.")
                             continue
@@ -417,9 +540,10 @@ def main():
                     try:
                         item = str(input("Enter stock code: ").upper().strip())
                         quantity = int(input("Enter quantity to remove: "))
-                        stock_manager.remove_stock(item, quantity)
+                        price = input("Enter sell price per unit (leave empty to skip): ").strip()
+                        stock_manager.remove_stock(item, quantity, float(price) if price else None)
                     except ValueError:
-                        print("Invalid input. Quantity must be a numeric value.")
+                        print("Invalid input. Quantity and price must be numeric values.")
 
                 elif choice == "3":
                     try:
@@ -438,6 +562,23 @@ def main():
                     stock_manager.display_portofolio()
 
                 elif choice == "6":
+                    if not stock_manager.get_all_stocks():
+                        print("No stock found.")
+                        continue
+                    # Rolling volatility and beta start from a year of stored history and follow every quote.
+                    prices = price_matrix(stock_manager.store, [f"{item}.JK" for item in stock_manager.get_all_stocks()] + ["^JKSE"], "1y")
+                    rolling = RollingMetrics.from_prices(prices) if not prices.empty else None
+                    try:
+                        watcher = PortfolioWatcher(stock_manager, interval=float(input("Enter refresh interval in seconds: ")), rolling=rolling)
+                    except ValueError:
+                        print("Invalid input. Interval must be a positive numeric value.")
+                        continue
+                    try:
+                        asyncio.run(watcher.run())
+                    except KeyboardInterrupt:
+                        print("\nStopped watching.")
+
+                elif choice == "7":
                     quit = True
 
                 else:
@@ -449,7 +590,7 @@ def main():
             quit = False
 
             while not quit:
-                print("\n1. Portfolio Performance\n2. Portfolio Risk Metrics\n3. Return")
+                print("\n1. Portfolio Performance\n2. Portfolio Risk Metrics\n3. Portfolio Value-at-Risk\n4. Optimize Portfolio Weights\n5. Rolling Risk Metrics\n6. Screen IDX Universe\n7. Return")
                 choice = input("Enter your choice: ")
 
                 if choice == "1":
@@ -457,8 +598,39 @@ def main():
 
                 elif choice == "2":
                     stock_analysis.display_risk_metrics()
-                
+
                 elif choice == "3":
+                    while True:
+                        try:
+                            confidence = float(input("Enter confidence level (%): ")) / 100
+                        except ValueError:
+                            confidence = None
+                        if confidence is not None and 0 < confidence < 1:
+                            break
+                        print("Invalid input. Confidence must be a number between 0 and 100.")
+                    while True:
+                        try:
+                            horizon = int(input("Enter horizon in trading days: "))
+                        except ValueError:
+                            horizon = None
+                        if horizon is not None and horizon >= 1:
+                            break
+                        print("Invalid input. Horizon must be a whole number of at least 1.")
+                    stock_analysis.display_value_at_risk(confidence, horizon)
+
+                elif choice == "4":
+                    stock_analysis.display_optimal_weights()
+
+                elif choice == "5":
+                    stock_analysis.display_rolling_metrics()
+
+                elif choice == "6":
+                    universe_path = input("Enter universe file (default: universe.txt): ").strip() or "universe.txt"
+                    query = input("Enter filter, e.g. beta < 0.8 and return_3m > 0.1 (blank for none): ").strip() or None
+                    sort_by = input("Enter metric to rank by (default: sharpe): ").strip() or "sharpe"
+                    stock_analysis.display_screen(universe_path, query, sort_by)
+                
+                elif choice == "7":
                     quit = True
 
                 else:
@@ -468,22 +640,48 @@ def main():
             quit = False
 
             while not quit:
-                print("\n1. SARIMAX Forecast\n2. LSTM Forecast\n3. Return")
+                print("\n1. SARIMAX Forecast\n2. LSTM Forecast\n3. Forecast Whole Portfolio\n4. Backtest Forecasts\n5. Return")
                 choice = input("Enter your choice: ")
 
                 if choice == "1":
                     item = str(input("Enter stock code: ").upper().strip())
                     day = int(input("Enter number of days to forecast: "))
-                    stock_forecast = QuantitativeAnalysis(symbol=item) 
+                    stock_forecast = QuantitativeAnalysis(symbol=item, store=stock_manager.store)
                     stock_forecast.sarimax_forecast(days=day)
 
                 elif choice == "2":
                     item = str(input("Enter stock code: ").upper().strip())
                     day = int(input("Enter number of days to forecast: "))
-                    stock_forecast = QuantitativeAnalysis(symbol=item)
+                    stock_forecast = QuantitativeAnalysis(symbol=item, store=stock_manager.store)
                     stock_forecast.lstm_forecast(day)
 
                 elif choice == "3":
+                    day = int(input("Enter number of days to forecast: "))
+                    output_dir = input("Enter output folder (default: forecasts): ").strip() or "forecasts"
+                    print("Forecasting all holdings in the background, this may take a while...")
+                    summary, wall_time = run_batch(list(stock_manager.get_all_stocks()), stock_manager.store, days=day, output_dir=output_dir)
+
+                    table = PrettyTable()
+                    table.field_names = ["Stock", "Model", "Status", "Last Forecast (Rp)"]
+                    for item, models in summary.items():
+                        for model, entry in models.items():
+                            last_forecast = f"{list(entry['forecast'].values())[-1]:.2f}" if entry["status"] == "ok" else "-"
+                            table.add_row([item, model.upper(), entry["status"], last_forecast])
+                    print(table)
+                    print(f"Finished in {wall_time:.1f}s. Forecasts and charts saved to {output_dir}")
+
+                elif choice == "4":
+                    item = str(input("Enter stock code: ").upper().strip())
+                    try:
+                        horizon = int(input("Enter forecast horizon in trading days: "))
+                    except ValueError:
+                        print("Invalid input. Horizon must be a numeric value.")
+                        continue
+                    mode = "rolling" if input("Use a rolling training window instead of expanding? (y/n): ").strip().lower() == "y" else "expanding"
+                    print("Running walk-forward backtest, this may take a while...")
+                    QuantitativeAnalysis(symbol=item, store=stock_manager.store).backtest_forecasts(horizon, mode)
+
+                elif choice == "5":
                     quit = True
 
                 else:
@@ -493,34 +691,92 @@ def main():
             quit = False
 
             while not quit:
-                print("\n1. IPO Warrant BEP\n2. ARA/ARB Simulation (Coming Soon)\n3. Return")
+                print("\n1. IPO Warrant BEP\n2. IPO Warrant BEP Table\n3. ARA/ARB Simulation\n4. Return")
                 choice = input("Enter your choice: ")
 
                 if choice == "1":
-                    stock_price = float(input("Enter stock price: "))
-                    stock, warrant = map(float, input("Enter warrant ratio (stock:warrant): ").split(':'))
-                    print("Select board")
-                    print("1. Utama/Pengembangan (Simetris ARA = ARB)")
-                    print("2. Akselerasi (ARA & ARB 10%)")
-                    board = int(input("Enter board: "))
-                    price, result = ipo_warrant_bep(stock_price, board, warrant, stock)
+                    try:
+                        stock_price = float(input("Enter stock price: "))
+                        stock, warrant = map(float, input("Enter warrant ratio (stock:warrant): ").split(':'))
+                        print("Select board")
+                        print("1. Utama/Pengembangan (Simetris ARA = ARB)")
+                        print("2. Akselerasi (ARA & ARB 10%)")
+                        board = int(input("Enter board: "))
+                        price, result = ipo_warrant_bep(stock_price, board, warrant, stock)
+                    except ValueError as error:
+                        print(f"Invalid input: {error}")
+                        continue
                     print(f"Sell warrant for a minimum of {price:.0f}")
 
                 elif choice == "2":
-                    print("Coming Soon")                
+                    try:
+                        stock_prices = [float(x) for x in input("Enter stock prices (comma separated): ").split(',')]
+                        ratios = [tuple(map(float, x.split(':'))) for x in input("Enter warrant ratios (stock:warrant, comma separated): ").split(',')]
+                        grid = ipo_warrant_bep_grid(stock_prices, ratios)
+                    except ValueError:
+                        print("Invalid input. Prices must be numeric values and ratios must look like stock:warrant.")
+                        continue
+
+                    table = PrettyTable()
+                    table.field_names = ["Stock Price", "Ratio", "Board", "Warrant BEP"]
+                    board_names = {1: "Utama/Pengembangan", 2: "Akselerasi"}
+                    for row in grid.itertuples(index=False):
+                        table.add_row([f"{row.stock_price:.0f}", row.ratio, board_names[row.board], f"{row.warrant_bep:.0f}"])
+                    print(table)
+
+                    filename = input("Save table to CSV (leave empty to skip): ").strip()
+                    if filename:
+                        grid.to_csv(filename, index=False)
+                        print(f"Table saved to {filename}")
 
                 elif choice == "3":
+                    try:
+                        stock_price = float(input("Enter stock price: "))
+                        print("Select board")
+                        print("1. Utama/Pengembangan (Simetris ARA = ARB)")
+                        print("2. Akselerasi (ARA & ARB 10%)")
+                        board = int(input("Enter board: ")) + 1
+                        days = int(input("Enter number of trading days to simulate: "))
+                        daily_volatility = float(input("Enter daily volatility (%): ")) / 100
+                        n_paths = int(input("Enter number of paths (e.g. 1000000): "))
+                        lots = int(input("Enter quantity in lots: "))
+                    except ValueError:
+                        print("Invalid input. All values must be numeric.")
+                        continue
+                    summary, stats = summarize_simulation(simulate_ara_arb(stock_price, board, days, n_paths, daily_volatility, lots=lots))
+
+                    table = PrettyTable()
+                    table.field_names = ["Percentile", "Exit Price (Rp)", "Profit/Loss (Rp)"]
+                    for label, row in summary.iterrows():
+                        color = Fore.GREEN if row["pnl"] >= 0 else Fore.RED
+                        table.add_row([label, f"{row['exit_price']:.2f}", f"{color}{row['pnl']:.2f}{Style.RESET_ALL}"])
+                    print(table)
+                    print(f"Probability of profit: {stats['probability_profit']:.2%}, loss: {stats['probability_loss']:.2%}")
+                    print(f"Average days at ARA: {stats['average_ara_days']:.2f}, at ARB: {stats['average_arb_days']:.2f}")
+
+                elif choice == "4":
                     quit = True
 
                 else:
                     print("Invalid choice.")
         
         elif choice == "5":
-            stock_manager.save_to_file(data_file)
+            stock_manager.save_to_file(data_file, compact=True)
+            print(stock_manager.store.report())
             break
 
         else:
             print("Invalid choice.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IDX portfolio management and quantitative analysis.")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=os.environ.get(PROFILE_ENV) or None,
+                        help=f"time analysis, fetch and model calls and print a timing tree on exit (or set {PROFILE_ENV})")
+    args = parser.parse_args()
+    try:
+        mode = profile_mode(args.profile)
+    except ValueError as error:
+        parser.error(str(error))
+    if mode:
+        enable(mode)
     main()
\ No newline at end of file
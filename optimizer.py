@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from risk import TRADING_DAYS
+
+def project_simplex(values):
+    # Euclidean projection of every row onto {w >= 0, sum(w) = 1} (Duchi et al., 2008).
+    ordered = -np.sort(-values, axis=1)
+    cumulative = np.cumsum(ordered, axis=1) - 1
+    positions = np.arange(1, values.shape[1] + 1)
+    rho = (ordered - cumulative / positions > 0).sum(axis=1)
+    theta = cumulative[np.arange(len(values)), rho - 1] / rho
+    return np.maximum(values - theta[:, None], 0.0)
+
+class PortfolioOptimizer:
+    def __init__(self, returns, risk_free_rate=0.0, shrinkage=0.1, long_only=True):
+        self.symbols = list(returns.columns)
+        self.risk_free_rate = risk_free_rate
+        self.long_only = long_only
+        self.mean = returns.mean().to_numpy() * TRADING_DAYS
+        covariance = returns.cov().to_numpy() * TRADING_DAYS
+        # With ~250 daily observations and hundreds of assets the sample covariance is close to
+        # singular; shrinking towards its diagonal keeps every solve well conditioned.
+        self.covariance = (1 - shrinkage) * covariance + shrinkage * np.diag(np.diag(covariance))
+
+    def _statistics(self, weights):
+        expected = weights @ self.mean
+        volatility = np.sqrt(np.einsum("ij,jk,ik->i", weights, self.covariance, weights))
+        return expected, volatility, (expected - self.risk_free_rate) / volatility
+
+    def _closed_form(self):
+        # One factorization serves every point: all unconstrained frontier portfolios are
+        # affine in the target return, w(t) = g + h * t.
+        inverse_ones, inverse_mean = np.linalg.solve(self.covariance, np.column_stack([np.ones(len(self.mean)), self.mean])).T
+        a, b, c = inverse_ones.sum(), inverse_mean.sum(), self.mean @ inverse_mean
+        d = a * c - b * b
+        return (c * inverse_ones - b * inverse_mean) / d, (a * inverse_mean - b * inverse_ones) / d, inverse_ones / a
+
+    def _long_only(self, risk_aversions, iterations=5000, tolerance=1e-7):
+        # Accelerated projected gradient on mean - risk_aversion / 2 * variance, one row per risk
+        # aversion, all rows advanced together.
+        risk_aversions = np.asarray(risk_aversions, dtype=float)[:, None]
+        step = 1.0 / (risk_aversions * np.linalg.eigvalsh(self.covariance)[-1])
+        weights = np.full((len(risk_aversions), len(self.mean)), 1.0 / len(self.mean))
+        momentum, t = weights.copy(), np.ones((len(risk_aversions), 1))
+        for _ in range(iterations):
+            gradient = self.mean - risk_aversions * (momentum @ self.covariance)
+            updated = project_simplex(momentum + step * gradient)
+            # Restart the momentum of any row that starts climbing back down (O'Donoghue & Candes).
+            t[((updated - weights) * gradient).sum(axis=1) < 0] = 1.0
+            t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            momentum = updated + (t - 1) / t_next * (updated - weights)
+            converged = np.abs(updated - weights).max() < tolerance
+            weights, t = updated, t_next
+            if converged:
+                break
+        return weights
+
+    def _target_weights(self, guess, target, max_changes=50):
+        # Exact minimum-variance weights for one target return. The equality-constrained problem is
+        # solved on the assets held by guess; an asset is dropped while its weight comes out negative
+        # and added while leaving it out violates the KKT conditions. Returns None if that fails.
+        support = guess > 1e-6
+        for _ in range(max_changes):
+            held = np.flatnonzero(support)
+            size = len(held)
+            system = np.zeros((size + 2, size + 2))
+            system[:size, :size] = self.covariance[np.ix_(held, held)]
+            system[:size, size], system[:size, size + 1] = -1.0, -self.mean[held]
+            system[size, :size], system[size + 1, :size] = 1.0, self.mean[held]
+            try:
+                solution = np.linalg.solve(system, np.r_[np.zeros(size), 1.0, target])
+            except np.linalg.LinAlgError:
+                return None
+            if solution[:size].min() < -1e-12:
+                support[held[np.argmin(solution[:size])]] = False
+                continue
+            weights = np.zeros(len(self.mean))
+            weights[held] = np.maximum(solution[:size], 0.0)
+            reduced = self.covariance @ weights - solution[size] - solution[size + 1] * self.mean
+            reduced[held] = np.inf
+            if reduced.min() < -1e-12:
+                support[np.argmin(reduced)] = True
+                continue
+            return weights
+        return None
+
+    def frontier(self, n_points=50, sweep_points=20):
+        if self.long_only:
+            # Risk aversions on a grid bunch the points up at both ends of the frontier, so the points
+            # are spaced evenly in return instead. A coarse sweep brackets each target; the mix of the
+            # bracketing portfolios has exactly the target return and seeds the exact solve.
+            sweep = self._long_only(np.r_[np.logspace(-1, 4, sweep_points), 1e8], tolerance=1e-5)
+            top = np.zeros(len(self.mean))
+            top[np.argmax(self.mean)] = 1.0
+            sweep = np.vstack([sweep, top])
+            sweep_returns = sweep @ self.mean
+            order = np.argsort(sweep_returns)
+            sweep, sweep_returns = sweep[order], sweep_returns[order]
+            weights = []
+            for target in np.linspace(sweep_returns[0], sweep_returns[-1], n_points):
+                upper = min(max(np.searchsorted(sweep_returns, target), 1), len(sweep) - 1)
+                span = sweep_returns[upper] - sweep_returns[upper - 1]
+                share = (target - sweep_returns[upper - 1]) / span if span > 0 else 1.0
+                guess = (1 - share) * sweep[upper - 1] + share * sweep[upper]
+                exact = self._target_weights(guess, target)
+                weights.append(guess if exact is None else exact)
+            weights = np.array(weights)
+        else:
+            g, h, minimum = self._closed_form()
+            targets = np.linspace(minimum @ self.mean, self.mean.max(), n_points)
+            weights = g[None, :] + targets[:, None] * h[None, :]
+        expected, volatility, sharpe = self._statistics(weights)
+        order = np.argsort(volatility)
+        points = pd.DataFrame({"return": expected[order], "volatility": volatility[order], "sharpe": sharpe[order]})
+        return points, pd.DataFrame(weights[order], columns=self.symbols)
+
+    def min_variance(self):
+        if self.long_only:
+            weights = self._long_only([1e8])[0]
+        else:
+            weights = self._closed_form()[2]
+        return pd.Series(weights, index=self.symbols)
+
+    def max_sharpe(self, n_points=25, refinements=2):
+        if self.long_only:
+            # Sharpe is unimodal along the frontier: scan a coarse grid of risk aversions, then
+            # re-grid between the neighbours of the best point.
+            risk_aversions = np.logspace(-1, 4, n_points)
+            for _ in range(refinements + 1):
+                weights = self._long_only(risk_aversions)
+                best = int(np.argmax(self._statistics(weights)[2]))
+                low, high = risk_aversions[max(best - 1, 0)], risk_aversions[min(best + 1, n_points - 1)]
+                best_weights, risk_aversions = weights[best], np.geomspace(low, high, n_points)
+            return pd.Series(best_weights, index=self.symbols)
+        excess = np.linalg.solve(self.covariance, self.mean - self.risk_free_rate)
+        return pd.Series(excess / excess.sum(), index=self.symbols)
+
+    def describe(self, weights):
+        expected, volatility, sharpe = self._statistics(np.asarray(weights, dtype=float)[None, :])
+        return {"return": expected[0], "volatility": volatility[0], "sharpe": sharpe[0]}
+
+def rebalance_trades(weights, quantities, prices, lot_size=100):
+    quantities = pd.Series(quantities, dtype=float).reindex(weights.index, fill_value=0)
+    prices = pd.Series(prices, dtype=float).reindex(weights.index)
+    total_value = (quantities * prices * lot_size).sum()
+    # Rounding down keeps the rebalanced portfolio within the current market value.
+    target = np.floor(weights.clip(lower=0) * total_value / (prices * lot_size))
+    return pd.DataFrame({
+        "current_lots": quantities,
+        "target_lots": target,
+        "trade_lots": target - quantities,
+        "trade_value": (target - quantities) * prices * lot_size,
+        "target_weight": weights,
+    })
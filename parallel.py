@@ -0,0 +1,63 @@
+import multiprocessing as mp
+import os
+import time
+from multiprocessing.connection import wait
+
+def get_context(preload=()):
+    # forkserver children fork from a clean server process, so they never inherit TensorFlow
+    # state from the parent; Windows only has spawn.
+    if "forkserver" in mp.get_all_start_methods():
+        context = mp.get_context("forkserver")
+        context.set_forkserver_preload(list(preload))
+        return context
+    return mp.get_context("spawn")
+
+def _worker(conn, func, args):
+    try:
+        conn.send(("ok", func(*args)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def run_parallel(func, tasks, max_workers=None, timeout=None, preload=()):
+    # Every task runs in its own process so a task that exceeds its timeout can be terminated
+    # without taking down the others. Results come back as (status, value) in task order.
+    context = get_context(preload)
+    max_workers = max_workers or os.cpu_count() or 1
+    pending = list(enumerate(tasks))
+    running = {}
+    results = [None] * len(pending)
+
+    while pending or running:
+        while pending and len(running) < max_workers:
+            index, args = pending.pop(0)
+            parent_conn, child_conn = context.Pipe(duplex=False)
+            process = context.Process(target=_worker, args=(child_conn, func, args), daemon=True)
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (index, process, None if timeout is None else time.monotonic() + timeout)
+
+        deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+        wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+        for conn in wait(list(running), wait_for):
+            index, process, _ = running.pop(conn)
+            try:
+                result = conn.recv()
+            except EOFError:
+                result = None
+            conn.close()
+            # The exit code is only set once the process has been joined.
+            process.join()
+            results[index] = result if result is not None else ("error", f"worker exited with code {process.exitcode}")
+
+        now = time.monotonic()
+        for conn, (index, process, deadline) in list(running.items()):
+            if deadline is not None and now >= deadline:
+                process.terminate()
+                process.join()
+                conn.close()
+                del running[conn]
+                results[index] = ("timeout", None)
+
+    return results
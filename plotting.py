@@ -0,0 +1,80 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import date2num
+from matplotlib.figure import Figure
+
+from instrument import timed
+
+FIGSIZE = (10, 5)
+DPI = 100
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets (Steinarsson, 2013): keeps the first and last points and, from
+    # each bucket in between, the point forming the largest triangle with the previously kept point
+    # and the average of the next bucket. Returns the indices of the kept points.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    bounds = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(int) + 1
+    bounds[-1] = n - 1
+    # Every bucket's mean up front from one cumulative sum; the last bucket's "next" is the final point.
+    sums_x, sums_y = np.concatenate([[0.0], np.cumsum(x)]), np.concatenate([[0.0], np.cumsum(y)])
+    sizes = np.diff(bounds)
+    mean_x = np.append((sums_x[bounds[1:]] - sums_x[bounds[:-1]]) / sizes, x[-1])
+    mean_y = np.append((sums_y[bounds[1:]] - sums_y[bounds[:-1]]) / sizes, y[-1])
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+def downsample(series, points):
+    series = series.dropna()
+    if len(series) <= points:
+        return series
+    x = series.index.asi8.astype(float) if hasattr(series.index, "asi8") else np.arange(len(series), dtype=float)
+    return series.iloc[lttb(x, series.to_numpy(dtype=float), points)]
+
+class ChartRenderer:
+    # One Agg figure reused for every chart: each render only swaps the line data, labels and title,
+    # so generating many charts never re-creates a figure, axes or canvas. Nothing touches pyplot or
+    # a GUI toolkit.
+    def __init__(self, figsize=FIGSIZE, dpi=DPI):
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.ax.xaxis_date()
+        self.ax.set_xlabel('Date')
+        self.ax.set_ylabel('Stock Price')
+        self.actual_line, = self.ax.plot([], [], label='Actual')
+        self.forecast_line, = self.ax.plot([], [])
+        # One point per horizontal pixel is all the figure can show.
+        self.points = int(figsize[0] * dpi)
+
+    def render(self, actual, forecast, title, path, forecast_label='Predicted', linestyle=None):
+        actual = downsample(actual, self.points)
+        self.actual_line.set_data(date2num(actual.index), actual.to_numpy())
+        self.forecast_line.set_data(date2num(forecast.index), forecast.to_numpy())
+        self.forecast_line.set_label(forecast_label)
+        self.forecast_line.set_linestyle(linestyle or '-')
+        self.ax.set_title(title)
+        self.ax.set_xlim(date2num(actual.index[0]), date2num(forecast.index[-1]))
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        self.ax.legend()
+        self.figure.savefig(path)
+        return path
+
+_renderer = None
+
+@timed()
+def save_forecast(actual, forecast, title, path, forecast_label='Predicted', linestyle=None):
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer()
+    return _renderer.render(actual, forecast, title, path, forecast_label, linestyle)
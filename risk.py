@@ -0,0 +1,169 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from datastore import period_start
+from instrument import timed
+
+TRADING_DAYS = 252
+METRICS = ["volatility", "beta", "alpha", "sharpe", "sortino", "max_drawdown"]
+
+@timed()
+def price_matrix(store, symbols, period="1y"):
+    frames = store.history_many(list(symbols), period)
+    return pd.concat({symbol: frames[symbol]["Close"] for symbol in symbols}, axis=1).sort_index()
+
+@timed()
+def returns_matrix(prices):
+    # Returns are taken on each ticker's own trading days: each close is compared with that ticker's
+    # previous close, however many other tickers' sessions lie in between.
+    return (prices / prices.ffill().shift(1) - 1).where(prices.notna())
+
+def _masked_moments(values, valid):
+    count = valid.sum(axis=0)
+    filled = np.where(valid, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=0) / count
+        centered = np.where(valid, values - mean, 0.0)
+    return count, mean, centered
+
+class RiskEngine:
+    def __init__(self, store, benchmark="^JKSE", period="1y", volatility_period="252d"):
+        self.store = store
+        self.benchmark = benchmark
+        self.period = period
+        self.volatility_period = volatility_period
+
+    @timed()
+    def compute(self, prices, risk_free_rate=0):
+        symbols = [symbol for symbol in prices.columns if symbol != self.benchmark]
+        returns = returns_matrix(prices)
+        r = returns[symbols].to_numpy(dtype=float)
+        m = returns[self.benchmark].to_numpy(dtype=float)[:, None]
+        valid = ~np.isnan(r)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            count, mean, centered = _masked_moments(r, valid)
+            std = np.sqrt((centered ** 2).sum(axis=0) / (count - 1))
+            sharpe = (mean - risk_free_rate) / std
+            downside = np.where(valid, np.minimum(r - risk_free_rate, 0.0), 0.0)
+            sortino = (mean - risk_free_rate) / np.sqrt((downside ** 2).sum(axis=0) / count)
+
+            window = returns_matrix(prices[prices.index >= period_start(self.volatility_period)])[symbols].to_numpy(dtype=float)
+            vol_count, _, vol_centered = _masked_moments(window, ~np.isnan(window))
+            volatility = np.sqrt((vol_centered ** 2).sum(axis=0) / (vol_count - 1) * TRADING_DAYS)
+
+            # Closed-form OLS of stock returns on index returns over the dates both traded.
+            paired = valid & ~np.isnan(m)
+            pair_count, pair_mean_r, pair_centered_r = _masked_moments(r, paired)
+            _, pair_mean_m, pair_centered_m = _masked_moments(np.broadcast_to(m, r.shape), paired)
+            covariance = (pair_centered_r * pair_centered_m).sum(axis=0) / (pair_count - 1)
+            market_variance = (pair_centered_m ** 2).sum(axis=0) / (pair_count - 1)
+            alpha = pair_mean_r - covariance / market_variance * pair_mean_m
+            # Beta keeps its original definition, which divides by the variance of every index return in
+            # the window; it differs from the OLS slope only when the stock skipped sessions.
+            index_count, _, index_centered = _masked_moments(m, ~np.isnan(m))
+            beta = covariance / ((index_centered ** 2).sum(axis=0) / (index_count - 1))
+
+            p = prices[symbols].to_numpy(dtype=float)
+            max_drawdown = np.nanmin(p / np.fmax.accumulate(p, axis=0) - 1, axis=0)
+
+        return pd.DataFrame(
+            {"volatility": volatility, "beta": beta, "alpha": alpha, "sharpe": sharpe, "sortino": sortino, "max_drawdown": max_drawdown},
+            index=symbols,
+        )
+
+    def metrics(self, symbols, risk_free_rate=0):
+        prices = price_matrix(self.store, list(dict.fromkeys(symbols)) + [self.benchmark], self.period)
+        return self.compute(prices, risk_free_rate)
+
+VAR_METHODS = ["historical", "parametric", "monte_carlo"]
+# Fixed so the menu reports the same Monte Carlo VaR for the same portfolio and prices.
+VAR_SEED = 42
+JITTER_ATTEMPTS = 20
+
+def _cholesky(covariance):
+    # Sample covariances of co-moving stocks can be numerically singular; add the smallest
+    # diagonal jitter that makes the factorization succeed. The floor keeps the jitter growing when
+    # every holding is flat (e.g. suspended or stuck at Rp50) and the diagonal is all zeros.
+    scale = max(np.mean(np.diag(covariance)), np.finfo(float).tiny)
+    jitter = 0.0
+    for _ in range(JITTER_ATTEMPTS):
+        try:
+            return np.linalg.cholesky(covariance + jitter * np.eye(len(covariance)))
+        except np.linalg.LinAlgError:
+            jitter = max(scale * 1e-10, 1e-12) if jitter == 0.0 else jitter * 10
+    raise ValueError("Covariance matrix is not positive semi-definite; cannot simulate scenarios")
+
+def _tail(losses, worst, count):
+    # Keeps only the `count` largest losses seen so far, so memory does not grow with the scenario count.
+    merged = np.concatenate([worst, losses])
+    if len(merged) <= count:
+        return merged
+    return np.partition(merged, len(merged) - count)[-count:]
+
+@timed()
+def value_at_risk(returns, exposures, confidence=0.95, horizon=1, method="historical", n_scenarios=1_000_000, chunk_size=100_000, seed=None):
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+    if horizon < 1 or int(horizon) != horizon:
+        raise ValueError(f"Horizon must be a whole number of trading days of at least 1, got {horizon}")
+    horizon = int(horizon)
+    returns = returns.dropna().to_numpy(dtype=float)
+    exposures = np.asarray(exposures, dtype=float)
+
+    if method == "parametric":
+        z = NormalDist().inv_cdf(1 - confidence)
+        mean = horizon * returns.mean(axis=0) @ exposures
+        std = np.sqrt(horizon * exposures @ np.cov(returns, rowvar=False, ddof=1).reshape(len(exposures), -1) @ exposures)
+        var = -(mean + z * std)
+        cvar = -(mean - std * NormalDist().pdf(z) / (1 - confidence))
+        return var, cvar
+
+    if method == "historical":
+        # Multi-day losses come from overlapping windows of consecutive daily P&L.
+        if horizon >= len(returns):
+            raise ValueError(f"Historical VaR needs more than {horizon} days of aligned returns, got {len(returns)}")
+        daily = returns @ exposures
+        cumulative = np.concatenate([[0.0], np.cumsum(daily)])
+        losses = -(cumulative[horizon:] - cumulative[:-horizon])
+    elif method == "monte_carlo":
+        rng = np.random.default_rng(seed)
+        mean = horizon * returns.mean(axis=0)
+        factor = np.sqrt(horizon) * _cholesky(np.cov(returns, rowvar=False, ddof=1).reshape(len(exposures), -1))
+        count = int(np.ceil((1 - confidence) * n_scenarios))
+        losses = np.empty(0)
+        for start in range(0, n_scenarios, chunk_size):
+            size = min(chunk_size, n_scenarios - start)
+            scenarios = mean + rng.standard_normal((size, len(exposures))) @ factor.T
+            losses = _tail(-(scenarios @ exposures), losses, count)
+        tail = np.sort(losses)
+        return tail[0], tail.mean()
+    else:
+        raise ValueError(f"Unknown VaR method: {method}")
+
+    var = np.quantile(losses, confidence)
+    return var, losses[losses >= var].mean()
+
+@timed()
+def var_breakdown(returns, exposures, confidence=0.95, horizon=1):
+    # Parametric Euler allocation: component VaRs add up to the portfolio VaR.
+    returns = returns.dropna()
+    if len(returns) < 2:
+        raise ValueError(f"VaR breakdown needs at least 2 days of aligned returns, got {len(returns)}")
+    exposures = pd.Series(np.asarray(exposures, dtype=float), index=returns.columns)
+    z = NormalDist().inv_cdf(1 - confidence)
+    covariance = returns.cov().to_numpy()
+    std = np.sqrt(exposures.to_numpy() @ covariance @ exposures.to_numpy())
+    if std == 0:
+        raise ValueError("Portfolio returns have zero variance; there is no VaR to break down")
+    marginal = -(horizon * returns.mean().to_numpy() + z * np.sqrt(horizon) * (covariance @ exposures.to_numpy()) / std)
+    component = exposures.to_numpy() * marginal
+    return pd.DataFrame({
+        "exposure": exposures,
+        "weight": exposures / exposures.sum(),
+        "marginal_var": marginal,
+        "component_var": component,
+        "contribution": component / component.sum(),
+    })
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from instrument import timed
+from risk import TRADING_DAYS, returns_matrix
+
+WINDOWS = (20, 60, 120)
+ROLLING_METRICS = ["volatility", "beta", "alpha", "correlation"]
+# A window only produces a value once at least this share of its bars has a return.
+MIN_COVERAGE = 0.5
+RESYNC_EVERY = 1000
+SUMS = 9
+
+def _contributions(r, m):
+    # Terms of every running sum for returns r (..., n) against benchmark returns m (..., 1), stacked
+    # on axis -2. Volatility uses each stock's own valid days; beta, alpha and correlation the days both traded.
+    own = ~np.isnan(r)
+    paired = own & ~np.isnan(m)
+    r_own = np.where(own, r, 0.0)
+    r_paired = np.where(paired, r, 0.0)
+    m_paired = np.where(paired, m, 0.0)
+    return np.stack([own, r_own, r_own * r_own, paired, r_paired, m_paired,
+                     r_paired * r_paired, m_paired * m_paired, r_paired * m_paired], axis=-2).astype(float)
+
+def _from_sums(sums, window):
+    own, sum_r, sum_rr, paired, sum_pr, sum_pm, sum_prr, sum_pmm, sum_prm = np.moveaxis(sums, -2, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = np.maximum(sum_rr - sum_r * sum_r / own, 0.0) / (own - 1)
+        covariance = sum_prm - sum_pr * sum_pm / paired
+        market_variance = np.maximum(sum_pmm - sum_pm * sum_pm / paired, 0.0)
+        stock_variance = np.maximum(sum_prr - sum_pr * sum_pr / paired, 0.0)
+        beta = covariance / market_variance
+        metrics = {
+            "volatility": np.sqrt(variance * TRADING_DAYS),
+            "beta": beta,
+            "alpha": (sum_pr - beta * sum_pm) / paired,
+            "correlation": covariance / np.sqrt(stock_variance * market_variance),
+        }
+    min_periods = max(2, int(window * MIN_COVERAGE))
+    metrics["volatility"] = np.where(own >= min_periods, metrics["volatility"], np.nan)
+    for name in ["beta", "alpha", "correlation"]:
+        metrics[name] = np.where(paired >= min_periods, metrics[name], np.nan)
+    return metrics
+
+@timed()
+def rolling_metrics(prices, benchmark="^JKSE", windows=WINDOWS):
+    # One cumulative sum per term gives every window's sums by differencing, so each series is a single pass.
+    symbols = [symbol for symbol in prices.columns if symbol != benchmark]
+    returns = returns_matrix(prices)
+    terms = _contributions(returns[symbols].to_numpy(dtype=float), returns[[benchmark]].to_numpy(dtype=float))
+    cumulative = np.concatenate([np.zeros((1,) + terms.shape[1:]), np.cumsum(terms, axis=0)])
+    ends = np.arange(1, len(terms) + 1)
+
+    result = {}
+    for window in windows:
+        metrics = _from_sums(cumulative[ends] - cumulative[np.maximum(ends - window, 0)], window)
+        result[window] = pd.concat({name: pd.DataFrame(metrics[name], index=prices.index, columns=symbols) for name in ROLLING_METRICS}, axis=1)
+    return result
+
+class RollingMetrics:
+    def __init__(self, symbols, benchmark="^JKSE", windows=WINDOWS):
+        self.symbols = list(symbols)
+        self.benchmark = benchmark
+        self.windows = np.array(sorted(windows))
+        self.columns = self.symbols + [benchmark]
+        size, n = self.windows[-1], len(self.symbols)
+        # Ring buffer of the last `size` bars' sum terms: dropping a bar out of a window is one subtraction.
+        self.terms = np.zeros((size, SUMS, n))
+        self.sums = np.zeros((len(self.windows), SUMS, n))
+        self.count = 0
+        self.since_resync = 0
+        self.date = None
+        self.close = np.full(n + 1, np.nan)
+        self.base = np.full(n + 1, np.nan)
+        self.bar = np.full(n + 1, np.nan)
+
+    @classmethod
+    def from_prices(cls, prices, benchmark="^JKSE", windows=WINDOWS):
+        rolling = cls([symbol for symbol in prices.columns if symbol != benchmark], benchmark, windows)
+        prices = prices[rolling.columns]
+        returns = returns_matrix(prices).to_numpy(dtype=float)
+        terms = _contributions(returns[:, :-1], returns[:, -1:])
+        size = len(rolling.terms)
+        tail = terms[-size:]
+        rolling.count = len(terms)
+        rolling.terms[np.arange(len(terms) - len(tail), len(terms)) % size] = tail
+        rolling._resync()
+
+        values = prices.to_numpy(dtype=float)
+        rolling.date = prices.index[-1]
+        rolling.bar = returns[-1]
+        for j in range(len(rolling.columns)):
+            closes = values[~np.isnan(values[:, j]), j]
+            rolling.close[j] = closes[-1] if len(closes) else np.nan
+            rolling.base[j] = closes[-2] if len(closes) > 1 else np.nan
+        return rolling
+
+    def _resync(self):
+        # Re-add each window from the buffer to shed the rounding the running sums pick up over many updates.
+        size = len(self.terms)
+        for k, window in enumerate(self.windows):
+            slots = np.arange(max(self.count - window, 0), self.count) % size
+            self.sums[k] = self.terms[slots].sum(axis=0)
+        self.since_resync = 0
+
+    def update(self, closes, date=None):
+        # closes: {symbol: price} for any subset of the symbols and benchmark. A quote dated like the
+        # latest bar revises that bar in place, so intraday ticks can be fed as they arrive.
+        quote = np.array([closes.get(column, np.nan) for column in self.columns], dtype=float)
+        quoted = ~np.isnan(quote)
+
+        if date is not None and date == self.date and self.count:
+            slot = (self.count - 1) % len(self.terms)
+            in_bar = ~np.isnan(self.bar)
+            self.base = np.where(quoted & ~in_bar, self.close, self.base)
+            self.bar = np.where(quoted, quote / self.base - 1, self.bar)
+            self.close = np.where(quoted, quote, self.close)
+            terms = _contributions(self.bar[:-1], self.bar[-1:])
+            self.sums += terms - self.terms[slot]
+            self.terms[slot] = terms
+            return
+
+        self.base = np.where(quoted, self.close, np.nan)
+        self.bar = quote / self.base - 1
+        self.close = np.where(quoted, quote, self.close)
+        self.date = date
+        terms = _contributions(self.bar[:-1], self.bar[-1:])
+
+        size = len(self.terms)
+        leaving = self.count - self.windows
+        full = leaving >= 0
+        self.sums[full] -= self.terms[leaving[full] % size]
+        self.terms[self.count % size] = terms
+        self.sums += terms
+        self.count += 1
+        self.since_resync += 1
+        if self.since_resync >= RESYNC_EVERY:
+            self._resync()
+
+    def latest(self):
+        frames = {}
+        for k, window in enumerate(self.windows):
+            metrics = _from_sums(self.sums[k], window)
+            frames[int(window)] = pd.DataFrame({name: metrics[name] for name in ROLLING_METRICS}, index=self.symbols)
+        return pd.concat(frames, axis=1)
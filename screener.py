@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from datastore import FETCH_MARGIN, YFinanceSource, fetch_many, period_start
+from instrument import record_fetch, span, timed
+from journal import write_atomic
+from risk import METRICS, TRADING_DAYS, RiskEngine
+
+SCREENER_DIR = os.path.join("cache", "screener")
+FIELDS = ["close", "volume"]
+HISTORY = "10y"
+CHUNK_SIZE = 100
+SCAN_WINDOW = TRADING_DAYS
+# Spare rows allocated on every resize, so a year of daily appends never reallocates.
+HEADROOM = TRADING_DAYS
+
+def load_universe(path):
+    # One ticker per line (e.g. BBCA or BBCA.JK); blank lines and '#' comments are ignored.
+    symbols = []
+    with open(path, 'r') as file:
+        for line in file:
+            ticker = line.split("#")[0].strip().upper()
+            if ticker:
+                symbols.append(ticker if "." in ticker or ticker.startswith("^") else f"{ticker}.JK")
+    return list(dict.fromkeys(symbols))
+
+class PriceMatrix:
+    # Close and volume as float32 matrices (trading days x tickers), memory-mapped from disk in
+    # column-major order so each ticker's history is one contiguous run. Rows follow the benchmark's
+    # trading calendar.
+    def __init__(self, directory=SCREENER_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self._path("meta.json"), 'r') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            meta = {"symbols": [], "dates": [], "capacity": 0, "synced": [], "empty": []}
+        self.symbols = meta["symbols"]
+        # Tickers whose full history has been stored.
+        self.synced = set(meta["synced"])
+        # Tickers whose full-history fetch came back without rows (not listed yet, delisted or a failed
+        # request). They are fetched incrementally from then on instead of for the whole history again.
+        self.empty = set(meta.get("empty", []))
+        self.dates = pd.DatetimeIndex(pd.to_datetime(meta["dates"]))
+        self.capacity = meta["capacity"]
+        self.columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.fields = {field: self._open(field) for field in FIELDS} if self.capacity and self.symbols else {}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self, field):
+        return np.memmap(self._path(f"{field}.f32"), dtype=np.float32, mode="r+", shape=(self.capacity, len(self.symbols)), order="F")
+
+    @property
+    def rows(self):
+        return len(self.dates)
+
+    def save(self):
+        for matrix in self.fields.values():
+            matrix.flush()
+        write_atomic(self._path("meta.json"), {
+            "symbols": self.symbols, "dates": self.dates.strftime('%Y-%m-%d').tolist(), "capacity": self.capacity,
+            "synced": sorted(self.synced), "empty": sorted(self.empty),
+        })
+
+    def reserve(self, rows, symbols):
+        # Grows the files to hold `rows` trading days and any new tickers, copying one ticker at a time.
+        new_symbols = [symbol for symbol in symbols if symbol not in self.columns]
+        if rows <= self.capacity and not new_symbols:
+            return
+        capacity = max(rows + HEADROOM, self.capacity)
+        all_symbols = self.symbols + new_symbols
+        for field in FIELDS:
+            grown = np.memmap(self._path(f"{field}.f32.tmp"), dtype=np.float32, mode="w+", shape=(capacity, len(all_symbols)), order="F")
+            grown[:] = np.nan
+            old = self.fields.get(field)
+            if old is not None:
+                for j in range(len(self.symbols)):
+                    grown[:self.rows, j] = old[:self.rows, j]
+            grown.flush()
+            del grown, old
+            self.fields.pop(field, None)
+            os.replace(self._path(f"{field}.f32.tmp"), self._path(f"{field}.f32"))
+        self.symbols, self.capacity = all_symbols, capacity
+        self.columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.fields = {field: self._open(field) for field in FIELDS}
+
+    def new_dates(self, dates):
+        return dates[dates > self.dates[-1]] if self.rows else dates
+
+    def write(self, symbol, frame):
+        # Bars on days outside the calendar (e.g. a ticker-only session) are dropped.
+        positions = self.dates.get_indexer(frame.index)
+        found = positions >= 0
+        column = self.columns[symbol]
+        self.fields["close"][positions[found], column] = frame["Close"].to_numpy(dtype=np.float32)[found]
+        self.fields["volume"][positions[found], column] = frame["Volume"].to_numpy(dtype=np.float32)[found]
+
+    def tail(self, field, rows):
+        start = max(self.rows - rows, 0)
+        return pd.DataFrame(np.asarray(self.fields[field][start:self.rows], dtype=float), index=self.dates[start:], columns=self.symbols)
+
+class Screener:
+    def __init__(self, directory=SCREENER_DIR, source=None, benchmark="^JKSE", history=HISTORY, chunk_size=CHUNK_SIZE):
+        self.matrix = PriceMatrix(directory)
+        self.source = source if source is not None else YFinanceSource()
+        self.benchmark = benchmark
+        self.history = history
+        self.chunk_size = chunk_size
+
+    @timed()
+    def sync(self, symbols):
+        # Tickers already in the matrix only fetch bars since the last stored day (plus a margin to pick
+        # up revisions); new tickers fetch the full history. Each chunk is written to disk before the
+        # next is fetched, so memory stays bounded by the chunk size.
+        symbols = [self.benchmark] + [symbol for symbol in dict.fromkeys(symbols) if symbol != self.benchmark]
+        full_start = period_start(self.history)
+        recent_start = self.matrix.dates[-1] - FETCH_MARGIN if self.matrix.rows else full_start
+
+        # The benchmark's bars define the calendar, so it is fetched first and the files are grown
+        # once for every new day and ticker before any chunk is written.
+        with span("provider fetch"):
+            benchmark = fetch_many(self.source, [self.benchmark], recent_start if self.benchmark in self.matrix.synced else full_start)[self.benchmark]
+        record_fetch(self.benchmark, 1, benchmark)
+        new_dates = self.matrix.new_dates(benchmark.index)
+        self.matrix.reserve(self.matrix.rows + len(new_dates), symbols)
+        self.matrix.dates = self.matrix.dates.append(new_dates)
+        self.matrix.write(self.benchmark, benchmark)
+        self.matrix.synced.add(self.benchmark)
+        fetched = len(benchmark)
+
+        checked = self.matrix.synced | self.matrix.empty
+        known = [symbol for symbol in symbols[1:] if symbol in checked]
+        fresh = [symbol for symbol in symbols[1:] if symbol not in checked]
+        for group, start in [(known, recent_start), (fresh, full_start)]:
+            for i in range(0, len(group), self.chunk_size):
+                chunk = group[i:i + self.chunk_size]
+                with span("provider fetch"):
+                    frames = fetch_many(self.source, chunk, start)
+                for symbol, frame in frames.items():
+                    record_fetch(symbol, 1, frame)
+                    if not frame.empty:
+                        self.matrix.write(symbol, frame)
+                        self.matrix.synced.add(symbol)
+                        self.matrix.empty.discard(symbol)
+                        fetched += len(frame)
+                    elif symbol not in self.matrix.synced:
+                        self.matrix.empty.add(symbol)
+                self.matrix.save()
+        self.matrix.save()
+        return fetched
+
+    @timed()
+    def scan(self, window=SCAN_WINDOW, risk_free_rate=0):
+        # Only the trailing window is read from the memory map, so a rescan costs the same however
+        # much history is stored.
+        if self.benchmark not in self.matrix.columns:
+            return pd.DataFrame(columns=METRICS)
+        close = self.matrix.tail("close", window + 1)
+        volume = self.matrix.tail("volume", 20)
+        close = close.loc[:, close.notna().sum() > 1]
+        metrics = RiskEngine(None, self.benchmark).compute(close, risk_free_rate)
+
+        filled = close.ffill()
+        for label, rows in [("return_1m", 21), ("return_3m", 63), ("return_1y", window)]:
+            metrics[label] = (filled.iloc[-1] / filled.iloc[max(len(filled) - 1 - rows, 0)] - 1).reindex(metrics.index)
+        metrics["last_close"] = filled.iloc[-1].reindex(metrics.index)
+        metrics["avg_value"] = (self.matrix.tail("close", 20) * volume).mean().reindex(metrics.index)
+        metrics.index = [symbol[:-3] if symbol.endswith(".JK") else symbol for symbol in metrics.index]
+        return metrics
+
+    def screen(self, query=None, sort_by=None, ascending=False, top=None, window=SCAN_WINDOW):
+        # query is a pandas DataFrame.query expression over the metric columns, e.g. "beta < 0.8 and return_3m > 0.1".
+        metrics = self.scan(window)
+        if query:
+            metrics = metrics.query(query)
+        if sort_by:
+            metrics = metrics.sort_values(sort_by, ascending=ascending)
+        return metrics.head(top) if top else metrics
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen the IDX universe on risk and return metrics against the benchmark.")
+    parser.add_argument("--universe", default="universe.txt", help="file with one ticker per line")
+    parser.add_argument("--no-sync", action="store_true", help="screen the stored prices without fetching")
+    parser.add_argument("--query", help='filter expression, e.g. "beta < 0.8 and return_3m > 0.1 and avg_value > 1e9"')
+    parser.add_argument("--sort", default="sharpe", help="metric to rank by")
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--top", type=int, default=50)
+    args = parser.parse_args()
+
+    screener = Screener()
+    if not args.no_sync:
+        print(f"Fetched {screener.sync(load_universe(args.universe))} bars")
+    print(screener.screen(args.query, args.sort, args.ascending, args.top).to_string())
+
+if __name__ == "__main__":
+    main()
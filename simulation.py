@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from calculator import price_limits, round_to_tick
+
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+def simulate_ara_arb(price, board, days=5, n_paths=1_000_000, daily_volatility=0.05, drift=0.0, lots=1, chunk_size=250_000, seed=None):
+    rng = np.random.default_rng(seed)
+    exit_prices = np.empty(n_paths)
+    ara_days = np.zeros(n_paths, dtype=np.int16)
+    arb_days = np.zeros(n_paths, dtype=np.int16)
+
+    # Paths are simulated a chunk at a time so memory is bounded by chunk_size, not n_paths.
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        prices = np.full(stop - start, float(price))
+        for _ in range(days):
+            # Limits follow the band of each path's reference price, so crossing 200/5000 changes them the next day.
+            upper, lower = price_limits(prices, board)
+            proposed = round_to_tick(prices * np.exp(drift + daily_volatility * rng.standard_normal(stop - start)))
+            ara_days[start:stop] += proposed >= upper
+            arb_days[start:stop] += proposed <= lower
+            prices = np.clip(proposed, lower, upper)
+        exit_prices[start:stop] = prices
+
+    pnl = (exit_prices - price) * lots * 100
+    return {"exit_prices": exit_prices, "pnl": pnl, "ara_days": ara_days, "arb_days": arb_days}
+
+def summarize_simulation(result):
+    exit_prices, pnl = result["exit_prices"], result["pnl"]
+    summary = pd.DataFrame(
+        {"exit_price": np.percentile(exit_prices, PERCENTILES), "pnl": np.percentile(pnl, PERCENTILES)},
+        index=[f"P{p}" for p in PERCENTILES],
+    )
+    summary.loc["Mean"] = [exit_prices.mean(), pnl.mean()]
+    stats = {
+        "probability_profit": float((pnl > 0).mean()),
+        "probability_loss": float((pnl < 0).mean()),
+        "average_ara_days": float(result["ara_days"].mean()),
+        "average_arb_days": float(result["arb_days"].mean()),
+    }
+    return summary, stats
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_frames(symbols, days=300, seed=0, start="2022-01-03"):
+    # Deterministic geometric random walks in the OHLCV layout the providers return.
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=days)
+    frames = {}
+    for symbol in symbols:
+        close = 1000 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+        frames[symbol] = pd.DataFrame({
+            "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+            "Volume": rng.integers(1_000, 1_000_000, days).astype(float),
+        }, index=index)
+    return frames
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("statsmodels")
+
+from backtest import backtest, cache_path, fold_cutoffs, load_folds
+from conftest import make_frames
+
+SYMBOL = "AAAA"
+
+def test_extending_history_computes_only_new_folds(tmp_path):
+    history = make_frames([SYMBOL], days=360)[SYMBOL]
+    cache_dir = str(tmp_path)
+    summary, _, info = backtest(SYMBOL, history.iloc[:300], models=("sarimax",), max_workers=1, cache_dir=cache_dir)
+    assert info["errors"] == {}
+    assert summary.loc["sarimax", "computed"] == len(fold_cutoffs(300)) == 3
+    first = load_folds(cache_path(SYMBOL, "sarimax", "expanding", 500, 5, cache_dir))
+
+    summary, _, info = backtest(SYMBOL, history, models=("sarimax",), max_workers=1, cache_dir=cache_dir)
+    assert summary.loc["sarimax", "computed"] == len(fold_cutoffs(360)) - 3 == 2
+    assert summary.loc["sarimax", "folds"] == 5
+    folds = load_folds(cache_path(SYMBOL, "sarimax", "expanding", 500, 5, cache_dir))
+    assert {key: folds[key] for key in first} == first
+
+def test_every_failed_chunk_is_reported(tmp_path):
+    history = make_frames([SYMBOL], days=300)[SYMBOL]
+    _, _, info = backtest(SYMBOL, history, models=("sarimax",), max_workers=2, timeout=0.001, cache_dir=str(tmp_path))
+    dates = [history.index[cutoff - 1].strftime('%Y-%m-%d') for cutoff in fold_cutoffs(300)]
+    assert sorted(info["errors"]["sarimax"]) == [f"timeout (folds ending {dates[0]}, {dates[2]})", f"timeout (folds ending {dates[1]})"]
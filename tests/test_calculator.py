@@ -0,0 +1,67 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from calculator import get_max_gain, ipo_warrant_bep, ipo_warrant_bep_array, ipo_warrant_bep_grid, round_to_tick
+
+def loop_bep(stock_price, board, warrant, stock):
+    # The original solver, raising the warrant price one rupiah at a time until the position profits,
+    # evaluated in exact arithmetic: in floats a break-even exactly on a price comes out as +/-1e-16
+    # noise, so the float loop itself is wrong on those ties.
+    board += 1
+    stock_lots = 10000
+    multiplier = Fraction(warrant) / Fraction(stock)
+    if board == 2:
+        loss = stock_price + stock_price * Fraction(str(get_max_gain(stock_price, "ARB", board)))
+    elif board == 3:
+        loss = stock_price - stock_price * Fraction(1, 10)
+    warrant_lots = multiplier * stock_lots
+    result, price = 0, 0
+    base_stock = stock_lots * stock_price * 100
+    base_loss = stock_lots * 100 * loss
+    while result <= 0:
+        price += 1
+        result = (base_loss + (price * warrant_lots * 100)) / base_stock - 1
+    return price, result
+
+GRID = [(price, board, warrant, stock)
+        for price in [51, 57, 60, 100, 103, 150, 199, 200, 210, 480, 500, 555, 1000, 1995, 2000, 4990, 5000, 7775]
+        for board in (1, 2)
+        for stock, warrant in [(1, 1), (2, 1), (3, 1), (10, 3), (10, 7), (4, 3), (5, 2), (100, 35)]]
+
+@pytest.mark.parametrize("stock_price, board, warrant, stock", GRID)
+def test_matches_loop_rounded_up_to_tick(stock_price, board, warrant, stock):
+    # The loop steps one rupiah and ignores price fractions; the closed form returns the first price on
+    # the IDX tick grid at or above the loop's answer.
+    expected, _ = loop_bep(stock_price, board, warrant, stock)
+    price, result = ipo_warrant_bep(stock_price, board, warrant, stock)
+    assert price == float(round_to_tick(expected, "up"))
+    assert result > 0
+
+def test_break_even_on_a_tick_moves_up():
+    assert ipo_warrant_bep(57, 2, 3, 10)[0] == loop_bep(57, 2, 3, 10)[0] == 20
+
+def test_grid_matches_scalar_solver():
+    grid = ipo_warrant_bep_grid([100, 1000, 6000], [(10, 3), (2, 1)], boards=(1, 2))
+    for row in grid.itertuples():
+        stock, warrant = map(float, row.ratio.split(":"))
+        assert row.warrant_bep == ipo_warrant_bep(row.stock_price, row.board, warrant, stock)[0]
+
+def test_array_sweep_matches_loop():
+    prices = np.arange(51, 400)
+    price, _ = ipo_warrant_bep_array(prices, 2, 3, 10)
+    expected = [round_to_tick(loop_bep(p, 2, 3, 10)[0], "up") for p in prices]
+    assert np.array_equal(price, expected)
+
+@pytest.mark.parametrize("board", [0, 3, -1, 7])
+def test_rejects_unknown_board(board):
+    with pytest.raises(ValueError):
+        ipo_warrant_bep(1000, board, 1, 2)
+    with pytest.raises(ValueError):
+        ipo_warrant_bep_grid([1000], [(2, 1)], boards=(1, board))
+
+@pytest.mark.parametrize("ratios", [[(10, 3), (2, 1, 4)], [(10,)], [(1, 2, 3, 4)]])
+def test_grid_rejects_malformed_ratios(ratios):
+    with pytest.raises(ValueError):
+        ipo_warrant_bep_grid([1000], ratios)
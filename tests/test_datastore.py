@@ -0,0 +1,89 @@
+import pandas as pd
+
+from conftest import make_frames
+from datastore import EARLIEST_START, FixtureSource, PriceStore, YFinanceSource
+
+SYMBOLS = [f"S{i:03d}.JK" for i in range(50)]
+
+def _store(**options):
+    today = pd.Timestamp.today().normalize()
+    frames = make_frames(SYMBOLS, days=60, start=today - pd.tseries.offsets.BDay(59))
+    return PriceStore(":memory:", source=FixtureSource(frames), **options)
+
+def _age(store, seconds):
+    store._db.execute("UPDATE sync SET synced_at = synced_at - ?", (seconds,))
+
+def test_quotes_refresh_after_quote_max_age():
+    store = _store(max_age=3600, quote_max_age=60)
+    store.history_many(SYMBOLS, "1mo")
+    calls = store.source.calls
+    store.quotes(SYMBOLS)
+    assert store.source.calls == calls
+
+    _age(store, 120)
+    store.history_many(SYMBOLS, "1mo")
+    assert store.source.calls == calls
+    store.quotes(SYMBOLS)
+    assert store.source.calls == calls + 1
+
+def test_history_refreshes_after_max_age():
+    store = _store(max_age=3600)
+    store.history_many(SYMBOLS, "1mo")
+    calls = store.source.calls
+    _age(store, 3601)
+    store.history_many(SYMBOLS, "1mo")
+    assert store.source.calls == calls + 1
+
+def test_sync_commits_once():
+    store = _store()
+    statements = []
+    store._db.set_trace_callback(statements.append)
+    store.sync_many(SYMBOLS, pd.Timestamp.today() - pd.Timedelta(days=30))
+    assert sum(statement.strip().upper() == "COMMIT" for statement in statements) == 1
+    assert store._db.execute("SELECT COUNT(*) FROM sync").fetchone()[0] == len(SYMBOLS)
+
+def test_stored_history_survives_reopening(tmp_path):
+    path = str(tmp_path / "prices.db")
+    today = pd.Timestamp.today().normalize()
+    source = FixtureSource(make_frames(SYMBOLS[:3], days=60, start=today - pd.tseries.offsets.BDay(59)))
+    store = PriceStore(path, source=source)
+    first = store.history_many(SYMBOLS[:3], "1mo")
+    store.close()
+
+    reopened = PriceStore(path, source=source)
+    calls = source.calls
+    second = reopened.history_many(SYMBOLS[:3], "1mo")
+    assert source.calls == calls
+    for symbol in SYMBOLS[:3]:
+        pd.testing.assert_frame_equal(first[symbol], second[symbol], check_freq=False)
+    reopened.close()
+
+def test_split_rebases_stored_history():
+    store = _store(max_age=3600)
+    symbol = SYMBOLS[0]
+    store.history(symbol, "1mo")
+    calls = store.source.calls
+    frame = store.source.frames[symbol]
+    store.source.frames[symbol] = frame.assign(**{column: frame[column] / 2 for column in ["Open", "High", "Low", "Close"]})
+    _age(store, 3601)
+    history = store.history(symbol, "1mo")
+    assert store.source.calls == calls + 2
+    expected = store.source.frames[symbol]
+    pd.testing.assert_frame_equal(history, expected[expected.index >= history.index[0]], check_freq=False)
+    # No bar stored before the split survives in the database either.
+    store._frames.clear()
+    stored = store._load(symbol)
+    pd.testing.assert_frame_equal(stored, expected[expected.index >= stored.index[0]], check_freq=False)
+
+def test_unchanged_refresh_keeps_stored_history():
+    store = _store(max_age=3600)
+    store.history_many(SYMBOLS, "1mo")
+    calls = store.source.calls
+    _age(store, 3601)
+    store.history_many(SYMBOLS, "1mo")
+    assert store.source.calls == calls + 1
+
+def test_backfill_without_start_keeps_end():
+    end = pd.Timestamp("2024-01-02")
+    assert YFinanceSource()._range(None, end) == {"start": EARLIEST_START.strftime("%Y-%m-%d"), "end": "2024-01-02"}
+    assert YFinanceSource()._range(None, None) == {"period": "max"}
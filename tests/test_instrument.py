@@ -0,0 +1,61 @@
+import re
+import time
+
+import pytest
+
+import instrument
+from instrument import Session, profile_mode, span, timed
+
+@pytest.mark.parametrize("value, mode", [("1", "tree"), ("tree", "tree"), ("cprofile", "cprofile"), (None, None), ("", None), ("0", None)])
+def test_profile_mode_parsing(value, mode):
+    assert profile_mode(value) == mode
+
+@pytest.mark.parametrize("value", ["2", "yes", "Tree"])
+def test_profile_mode_rejects_unknown_values(value):
+    with pytest.raises(ValueError):
+        profile_mode(value)
+    with pytest.raises(ValueError):
+        instrument.enable(value)
+
+def test_hooks_are_no_ops_when_off(monkeypatch):
+    monkeypatch.setattr(instrument, "_session", None)
+
+    @timed()
+    def double(value):
+        return value * 2
+
+    assert double(21) == 42
+    assert double.__name__ == "double"
+    assert span("anything") is instrument._NULL_SPAN
+    with span("anything"):
+        pass
+    assert instrument._session is None
+
+def test_timed_records_into_active_session(monkeypatch):
+    session = Session()
+    monkeypatch.setattr(instrument, "_session", session)
+
+    @timed("outer")
+    def outer():
+        with span("inner"):
+            time.sleep(0.002)
+
+    outer()
+    outer()
+    node = session.root.children["outer"]
+    assert node.calls == 2
+    assert node.children["inner"].calls == 2
+    assert node.seconds >= node.children["inner"].seconds > 0
+
+def test_folded_stacks_format():
+    session = Session()
+    with session.span("outer"):
+        time.sleep(0.002)
+        with session.span("inner"):
+            time.sleep(0.002)
+    session.root.seconds = time.perf_counter() - session.started
+    lines = session.folded().splitlines()
+    assert all(re.fullmatch(r"session(;[^; ]+)* \d+", line) for line in lines)
+    stacks = dict(line.rsplit(" ", 1) for line in lines)
+    assert int(stacks["session;outer;inner"]) >= 2000
+    assert int(stacks["session;outer"]) >= 2000
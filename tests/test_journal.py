@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from datastore import FixtureSource, PriceStore
+from journal import LotBook, journal_path
+from main import PortofolioManager
+
+@pytest.fixture
+def open_manager(tmp_path):
+    managers = []
+
+    def open_manager(filename="stock_data.json", compact_every=500):
+        manager = PortofolioManager(PriceStore(":memory:", FixtureSource()), compact_every)
+        manager.load_from_file(str(tmp_path / filename))
+        managers.append(manager)
+        return manager
+
+    yield open_manager
+    for manager in managers:
+        manager.journal.close()
+
+def _read(path):
+    with open(path, 'r') as file:
+        return file.read()
+
+def _trade(manager):
+    manager.add_stock("BBCA", 10, 9000.0)
+    manager.add_stock("BBCA", 10, 9500.0)
+    manager.remove_stock("BBCA", 5, 9800.0)
+
+def test_reload_replays_journal_after_snapshot(open_manager):
+    manager = open_manager()
+    _trade(manager)
+    manager.save_to_file(manager.filename)
+
+    reopened = open_manager()
+    assert reopened.seq == 3
+    assert reopened.get_all_stocks() == manager.get_all_stocks()
+    assert reopened.get_lots("BBCA") == [[5, 9000.0], [10, 9500.0]]
+
+def test_entries_already_in_snapshot_are_not_replayed(open_manager):
+    manager = open_manager()
+    _trade(manager)
+    with open(journal_path(manager.filename), 'rb') as file:
+        journal = file.read()
+    manager.save_to_file(manager.filename, compact=True)
+    manager.add_stock("TLKM", 3, 4000.0)
+    # A crash between writing the snapshot and truncating the journal leaves the compacted entries behind.
+    with open(journal_path(manager.filename), 'rb') as file:
+        tail = file.read()
+    with open(journal_path(manager.filename), 'wb') as file:
+        file.write(journal + tail)
+
+    reopened = open_manager()
+    assert reopened.seq == 4
+    assert reopened.get_all_stocks() == {"BBCA": {"quantity": 15, "price": 9250.0}, "TLKM": {"quantity": 3, "price": 4000.0}}
+
+def test_torn_final_line_is_cut_off(open_manager):
+    manager = open_manager()
+    _trade(manager)
+    path = journal_path(manager.filename)
+    with open(path, 'a') as file:
+        file.write('{"seq": 4, "op": "buy", "item": "TL')
+
+    reopened = open_manager()
+    assert reopened.seq == 3
+    with open(path, 'rb') as file:
+        assert file.read().endswith(b"}\n")
+    reopened.add_stock("TLKM", 3, 4000.0)
+
+    again = open_manager()
+    assert again.seq == 4
+    assert again.get_all_stocks()["TLKM"] == {"quantity": 3, "price": 4000.0}
+
+def test_compaction_rewrites_snapshot_and_empties_journal(open_manager):
+    manager = open_manager(compact_every=3)
+    manager.add_stock("BBCA", 10, 9000.0)
+    manager.save_to_file(manager.filename)
+    assert json.loads(_read(manager.filename))["seq"] == 0
+
+    manager.add_stock("BBCA", 10, 9500.0)
+    manager.remove_stock("BBCA", 5, 9800.0)
+    manager.save_to_file(manager.filename)
+    snapshot = json.loads(_read(manager.filename))
+    assert snapshot["seq"] == 3
+    assert snapshot["stock"] == manager.get_all_stocks()
+    assert _read(journal_path(manager.filename)) == ""
+
+    reopened = open_manager(compact_every=3)
+    assert reopened.get_all_stocks() == manager.get_all_stocks()
+    assert reopened.get_realized_profit_loss() == manager.get_realized_profit_loss()
+
+def test_legacy_file_loads_as_single_lots(open_manager, tmp_path):
+    with open(tmp_path / "legacy.json", 'w') as file:
+        json.dump({"BBCA": {"quantity": 10, "price": 9000.0}, "TLKM": {"quantity": 4, "price": 3500.0}}, file)
+
+    manager = open_manager("legacy.json")
+    assert manager.seq == 0
+    assert manager.get_all_stocks() == {"BBCA": {"quantity": 10, "price": 9000.0}, "TLKM": {"quantity": 4, "price": 3500.0}}
+    assert manager.get_lots("BBCA") == [[10, 9000.0]]
+    manager.remove_stock("BBCA", 4, 9500.0)
+    assert manager.get_realized_profit_loss() == {"BBCA": 500.0 * 4 * 100}
+
+def test_fifo_realized_across_partial_sells():
+    book = LotBook()
+    book.buy("BBCA", 10, 100.0)
+    book.buy("BBCA", 10, 200.0)
+    book.sell("BBCA", 5, 300.0)
+    assert book.realized["BBCA"] == 200.0 * 5 * 100
+    book.sell("BBCA", 10, 300.0)
+    assert book.realized["BBCA"] == 200.0 * 10 * 100 + 100.0 * 5 * 100
+    assert book.lots["BBCA"] == [[5, 200.0]]
+    assert book.fifo_cost("BBCA") == 200.0
+    # A sell without a price consumes lots without booking P&L.
+    book.sell("BBCA", 2)
+    assert book.lots["BBCA"] == [[3, 200.0]]
+    assert book.realized["BBCA"] == 200.0 * 10 * 100 + 100.0 * 5 * 100
@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from lstm_inference import REVISABLE_BARS, cache_path, fingerprint, load_cached, new_bars, trained_rows
+
+WINDOW, HORIZON = 30, 5
+
+def _values(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([1000 + np.cumsum(rng.normal(size=rows)), rng.integers(1_000, 100_000, rows)]).astype(float)
+
+def _meta(values, symbol="AAAA.JK"):
+    return {"series": {symbol: trained_rows(values)}}
+
+def test_unchanged_series_needs_nothing():
+    values = _values()
+    assert new_bars(_meta(values), {"AAAA.JK": values}, WINDOW, HORIZON) == {}
+
+def test_appended_bars_are_fine_tuned():
+    values = _values()
+    bars = new_bars(_meta(values[:-3]), {"AAAA.JK": values}, WINDOW, HORIZON)
+    # Every window whose target reaches one of the three new bars.
+    assert np.array_equal(bars["AAAA.JK"], values[-3 - WINDOW - HORIZON + 1:])
+
+def test_revised_latest_bar_is_fine_tuned_not_retrained():
+    values = _values()
+    revised = values.copy()
+    revised[-1] *= 1.01
+    bars = new_bars(_meta(values), {"AAAA.JK": revised}, WINDOW, HORIZON)
+    stable = len(values) - REVISABLE_BARS
+    assert np.array_equal(bars["AAAA.JK"], revised[stable - WINDOW - HORIZON + 1:])
+
+def test_revised_older_bar_forces_retraining():
+    values = _values()
+    revised = values.copy()
+    revised[len(values) - REVISABLE_BARS - 1] *= 1.01
+    assert new_bars(_meta(values), {"AAAA.JK": revised}, WINDOW, HORIZON) is None
+
+def test_unknown_or_truncated_series_forces_retraining():
+    values = _values()
+    assert new_bars(_meta(values), {"BBBB.JK": values}, WINDOW, HORIZON) is None
+    assert new_bars(_meta(values), {"AAAA.JK": values[:-1]}, WINDOW, HORIZON) is None
+
+def test_cache_without_revisable_tail_still_loads():
+    values = _values()
+    meta = {"series": {"AAAA.JK": {"rows": len(values), "fingerprint": fingerprint(values)}}}
+    assert new_bars(meta, {"AAAA.JK": values}, WINDOW, HORIZON) == {}
+    assert len(new_bars(meta, {"AAAA.JK": np.vstack([values, values[-1:]])}, WINDOW, HORIZON)["AAAA.JK"]) == WINDOW + HORIZON
+
+def test_numpy_forward_pass_matches_keras(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    from forecast_lstm import build_model
+    from lstm_inference import NumpyForecaster, export_weights
+
+    # Fixed initial weights, so the float32 round-off stays the same from run to run.
+    tf.keras.utils.set_random_seed(0)
+    model = build_model(WINDOW, 2, HORIZON)
+    # Fresh weights are small; scaling them up pushes the gates into their non-linear range, so a wrong
+    # gate order or activation cannot hide behind near-linear outputs.
+    model.set_weights([weight * 3 for weight in model.get_weights()])
+    path = export_weights(model, str(tmp_path / "weights.npz"))
+    x = np.random.default_rng(0).random((64, WINDOW, 2), dtype=np.float32)
+
+    expected = model(x, training=False).numpy()
+    actual = NumpyForecaster.load(path)(x)
+    assert actual.shape == expected.shape == (64, HORIZON)
+    assert np.allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_load_cached_uses_the_given_loader(tmp_path):
+    path = cache_path("AAAA.JK", WINDOW, HORIZON, str(tmp_path))
+    assert load_cached("AAAA.JK", WINDOW, HORIZON, str(tmp_path), loader=lambda path: "model") is None
+    os.makedirs(path)
+    with open(os.path.join(path, "meta.json"), 'w') as file:
+        json.dump({"series": {"AAAA.JK": dict(trained_rows(_values()), scaler={"min": [0, 0], "range": [1, 1]})}}, file)
+    model, meta = load_cached("AAAA.JK", WINDOW, HORIZON, str(tmp_path), loader=lambda cached: cached)
+    assert model == path
+    assert np.array_equal(meta["series"]["AAAA.JK"]["scaler"]["range"], [1, 1])
+    # The default loader needs the NumPy export, which this cache does not have.
+    assert load_cached("AAAA.JK", WINDOW, HORIZON, str(tmp_path)) is None
+
+def test_make_windows_rejects_short_series():
+    pytest.importorskip("tensorflow")
+    from forecast_lstm import make_windows
+
+    X, y = make_windows(_values(WINDOW + HORIZON), WINDOW, HORIZON)
+    assert X.shape == (1, WINDOW, 2) and y.shape == (1, HORIZON)
+    with pytest.raises(ValueError, match="at least 35 bars"):
+        make_windows(_values(WINDOW + HORIZON - 1), WINDOW, HORIZON)
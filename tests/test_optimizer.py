@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimizer import PortfolioOptimizer
+
+def _returns(assets, seed):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, (250, 1))
+    values = factor @ rng.normal(1, 0.5, (1, assets)) + rng.normal(rng.uniform(0, 0.001, assets), 0.02, (250, assets))
+    return pd.DataFrame(values, columns=[f"S{i}" for i in range(assets)])
+
+def _slsqp_volatility(optimizer, target):
+    minimize = pytest.importorskip("scipy.optimize").minimize
+    count = len(optimizer.mean)
+    result = minimize(lambda w: w @ optimizer.covariance @ w, np.full(count, 1.0 / count), method="SLSQP",
+                      jac=lambda w: 2 * optimizer.covariance @ w, bounds=[(0, 1)] * count,
+                      constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1},
+                                   {"type": "eq", "fun": lambda w: w @ optimizer.mean - target}],
+                      options={"ftol": 1e-15, "maxiter": 500})
+    assert result.success
+    return np.sqrt(result.fun)
+
+@pytest.mark.parametrize("assets, seed", [(3, 0), (5, 1), (8, 2)])
+def test_long_only_frontier_matches_slsqp(assets, seed):
+    optimizer = PortfolioOptimizer(_returns(assets, seed))
+    points, weights = optimizer.frontier(12)
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert (weights.to_numpy() >= 0).all()
+    for target, volatility in zip(points["return"], points["volatility"]):
+        assert volatility == pytest.approx(_slsqp_volatility(optimizer, target), rel=1e-5)
+
+def test_long_only_frontier_is_evenly_spaced():
+    optimizer = PortfolioOptimizer(_returns(40, 3))
+    points, _ = optimizer.frontier(30)
+    gaps = np.diff(points["return"].to_numpy())
+    assert gaps.min() > 0
+    assert gaps.max() == pytest.approx(gaps.min(), rel=1e-6)
+    assert points["return"].iloc[-1] == pytest.approx(optimizer.mean.max())
@@ -0,0 +1,26 @@
+import os
+import time
+
+from parallel import run_parallel
+
+def _task(kind, value):
+    if kind == "sleep":
+        time.sleep(value)
+    elif kind == "crash":
+        os._exit(value)
+    elif kind == "raise":
+        raise ValueError(value)
+    return value
+
+def test_timeouts_and_crashes_are_reported_per_task():
+    tasks = [("ok", 2), ("sleep", 30), ("crash", 3), ("raise", "bad"), ("ok", 5)]
+    started = time.monotonic()
+    results = run_parallel(_task, tasks, max_workers=2, timeout=1.0)
+    assert time.monotonic() - started < 10
+    assert results == [
+        ("ok", 2),
+        ("timeout", None),
+        ("error", "worker exited with code 3"),
+        ("error", "ValueError: bad"),
+        ("ok", 5),
+    ]
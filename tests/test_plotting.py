@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from plotting import downsample, lttb
+
+def _reference_lttb(x, y, threshold):
+    # Straightforward LTTB with an explicit mean per bucket.
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    selected, previous = [0], 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            end, next_x, next_y = n - 1, x[-1], y[-1]
+        else:
+            next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected.append(previous)
+    return np.array(selected + [n - 1])
+
+@pytest.mark.parametrize("n, threshold", [(1000, 100), (5000, 1000), (37, 10), (101, 3)])
+def test_lttb_keeps_endpoints_and_returns_threshold_points(n, threshold):
+    rng = np.random.default_rng(n)
+    x, y = np.arange(n, dtype=float), np.cumsum(rng.normal(size=n))
+    selected = lttb(x, y, threshold)
+    assert len(selected) == threshold
+    assert selected[0] == 0 and selected[-1] == n - 1
+    assert (np.diff(selected) > 0).all()
+    assert np.array_equal(selected, _reference_lttb(x, y, threshold))
+
+@pytest.mark.parametrize("threshold", [50, 51, 2])
+def test_lttb_passes_short_input_through(threshold):
+    x = np.arange(50, dtype=float)
+    assert np.array_equal(lttb(x, np.sin(x), threshold), np.arange(50))
+
+def test_downsample_keeps_short_series_unchanged():
+    series = pd.Series(np.arange(10, dtype=float), index=pd.bdate_range("2024-01-01", periods=10))
+    pd.testing.assert_series_equal(downsample(series, 10), series)
+    long = pd.Series(np.random.default_rng(0).normal(size=2000), index=pd.bdate_range("2015-01-01", periods=2000))
+    reduced = downsample(long, 200)
+    assert len(reduced) == 200
+    assert reduced.index[0] == long.index[0] and reduced.index[-1] == long.index[-1]
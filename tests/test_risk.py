@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from conftest import make_frames
+from datastore import FixtureSource, PriceStore
+from risk import RiskEngine
+
+BENCHMARK = "^JKSE"
+SYMBOLS = ["AAAA.JK", "BBBB.JK", "GAPS.JK", "FLAT.JK"]
+
+@pytest.fixture
+def store():
+    today = pd.Timestamp.today().normalize()
+    frames = make_frames(["AAAA.JK", "BBBB.JK", "GAPS.JK", "FLAT.JK", BENCHMARK], days=400, seed=7,
+                         start=today - pd.tseries.offsets.BDay(399))
+    # A suspension, and scattered sessions the stock did not trade, leave NaN gaps in the aligned matrix.
+    gaps = frames["GAPS.JK"]
+    frames["GAPS.JK"] = gaps.drop(gaps.index[-150:-130].append(gaps.index[-100::17]))
+    # A stock stuck at one price has zero variance.
+    frames["FLAT.JK"] = frames["FLAT.JK"].assign(Open=50.0, High=50.0, Low=50.0, Close=50.0)
+    store = PriceStore(":memory:", source=FixtureSource(frames))
+    yield store
+    store.close()
+
+def baseline(store, symbol, risk_free_rate=0):
+    # The per-holding calculations display_risk_metrics made before the risk engine, one download each.
+    close = store.history(symbol, "1y")["Close"]
+    index_close = store.history(BENCHMARK, "1y")["Close"]
+
+    recent = store.history(symbol, "252d")["Close"]
+    volatility = recent.pct_change().dropna().std() * (252 ** 0.5)
+
+    daily_returns = close.pct_change().dropna()
+    index_returns = index_close.pct_change().dropna()
+    beta = daily_returns.cov(index_returns) / index_returns.var()
+
+    data = pd.concat([close, index_close], axis=1, keys=['Stock', 'Market'])
+    data['StockReturns'] = data['Stock'].pct_change()
+    data['MarketReturns'] = data['Market'].pct_change()
+    data = data.dropna()
+    model = sm.OLS(data['StockReturns'], sm.add_constant(data['MarketReturns']))
+    alpha = model.fit().params['const']
+
+    stock_returns = (close / close.shift(1) - 1).dropna()
+    sharpe = (stock_returns.mean() - risk_free_rate) / stock_returns.std()
+    return {"volatility": volatility, "beta": beta, "alpha": alpha, "sharpe": sharpe}
+
+# The baseline divides by zero on the flat holding, as it always did.
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("risk_free_rate", [0, 0.0002])
+def test_engine_matches_per_holding_baseline(store, risk_free_rate):
+    metrics = RiskEngine(store, BENCHMARK).metrics(SYMBOLS, risk_free_rate)
+    for symbol in SYMBOLS:
+        expected = baseline(store, symbol, risk_free_rate)
+        for name, value in expected.items():
+            assert np.isclose(metrics.loc[symbol, name], value, rtol=1e-9, atol=1e-12, equal_nan=True), (symbol, name)
+
+def test_zero_variance_holding(store):
+    metrics = RiskEngine(store, BENCHMARK).metrics(SYMBOLS).loc["FLAT.JK"]
+    assert metrics["volatility"] == 0
+    assert metrics["beta"] == 0 and metrics["alpha"] == 0
+    assert metrics["max_drawdown"] == 0
+    assert np.isnan(metrics["sharpe"])
+
+def test_max_drawdown_and_sortino(store):
+    metrics = RiskEngine(store, BENCHMARK).metrics(SYMBOLS)
+    for symbol in ["AAAA.JK", "GAPS.JK"]:
+        close = store.history(symbol, "1y")["Close"]
+        assert np.isclose(metrics.loc[symbol, "max_drawdown"], (close / close.cummax() - 1).min())
+        returns = close.pct_change().dropna()
+        downside = np.sqrt((np.minimum(returns, 0) ** 2).mean())
+        assert np.isclose(metrics.loc[symbol, "sortino"], returns.mean() / downside)
+
+def test_one_fetch_for_all_holdings(store):
+    RiskEngine(store, BENCHMARK).metrics(SYMBOLS)
+    calls = store.source.calls
+    RiskEngine(store, BENCHMARK).metrics(SYMBOLS)
+    assert store.source.calls == calls
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_frames
+from rolling import RollingMetrics, rolling_metrics
+
+BENCHMARK = "^JKSE"
+WINDOWS = (5, 20, 60)
+
+def _prices(days=150):
+    frames = make_frames([BENCHMARK, "AAAA.JK", "BBBB.JK", "CCCC.JK"], days=days, seed=3)
+    prices = pd.concat({symbol: frame["Close"] for symbol, frame in frames.items()}, axis=1)
+    # Suspensions and sessions a ticker skipped, so the paired and own-day sums differ.
+    prices.iloc[40:55, 1] = np.nan
+    prices.iloc[[70, 71, 90], 2] = np.nan
+    prices.iloc[100, 0] = np.nan
+    return prices
+
+def _assert_matches_batch(rolling, prices):
+    batch = rolling_metrics(prices, BENCHMARK, WINDOWS)
+    latest = rolling.latest()
+    for window in WINDOWS:
+        expected = batch[window].iloc[-1].unstack(level=0)[latest[window].columns].loc[latest[window].index]
+        pd.testing.assert_frame_equal(latest[window], expected, check_names=False, rtol=1e-8, atol=1e-12)
+
+@pytest.mark.parametrize("seed_rows", [10, 80, 130])
+def test_incremental_updates_match_batch(seed_rows):
+    prices = _prices()
+    rolling = RollingMetrics.from_prices(prices.iloc[:seed_rows], BENCHMARK, WINDOWS)
+    _assert_matches_batch(rolling, prices.iloc[:seed_rows])
+    for date, row in prices.iloc[seed_rows:].iterrows():
+        rolling.update(row.dropna().to_dict(), date)
+    _assert_matches_batch(rolling, prices)
+
+def test_intraday_revisions_of_the_last_bar_match_batch():
+    prices = _prices()
+    rolling = RollingMetrics.from_prices(prices.iloc[:-1], BENCHMARK, WINDOWS)
+    date, final = prices.index[-1], prices.iloc[-1]
+    # Ticks arrive for a few tickers at a time and revise the same bar.
+    rolling.update({"AAAA.JK": final["AAAA.JK"] * 0.97, BENCHMARK: final[BENCHMARK] * 1.01}, date)
+    rolling.update({"BBBB.JK": final["BBBB.JK"] * 1.05}, date)
+    intraday = prices.copy()
+    intraday.iloc[-1] = np.nan
+    intraday.loc[date, ["AAAA.JK", BENCHMARK, "BBBB.JK"]] = [final["AAAA.JK"] * 0.97, final[BENCHMARK] * 1.01, final["BBBB.JK"] * 1.05]
+    _assert_matches_batch(rolling, intraday)
+
+    rolling.update(final.to_dict(), date)
+    _assert_matches_batch(rolling, prices)
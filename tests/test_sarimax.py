@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("statsmodels")
+
+import forecast_sarimax
+from conftest import make_frames
+from forecast_sarimax import REFIT_EVERY, WARM_MAXITER, fit, forecast, future_exog, load_params
+
+SYMBOL = "AAAA.JK"
+
+@pytest.fixture
+def fits(monkeypatch):
+    calls = []
+    original = forecast_sarimax.SARIMAX.fit
+
+    def counted(self, *args, **kwargs):
+        calls.append(kwargs)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(forecast_sarimax.SARIMAX, "fit", counted)
+    return calls
+
+def _history():
+    return make_frames([SYMBOL], days=320)[SYMBOL]
+
+def test_fit_caches_params(tmp_path, fits):
+    data = _history().iloc[:300]
+    result = fit(data, symbol=SYMBOL, cache_dir=str(tmp_path))
+    cached = load_params(SYMBOL, (1, 1, 1), str(tmp_path))
+    assert len(fits) == 1
+    assert np.allclose(cached["params"], result.params)
+    assert cached["last_date"] == data.index[-1].strftime("%Y-%m-%d")
+
+def test_few_new_bars_only_filter(tmp_path, fits):
+    history = _history()
+    first = fit(history.iloc[:300], symbol=SYMBOL, cache_dir=str(tmp_path))
+    filtered = fit(history.iloc[:300 + REFIT_EVERY - 1], symbol=SYMBOL, cache_dir=str(tmp_path))
+    assert len(fits) == 1
+    assert np.allclose(filtered.params, first.params)
+    assert filtered.nobs == 300 + REFIT_EVERY - 1
+    # The cache still dates from the last real fit, so the filter-only window keeps counting from there.
+    assert load_params(SYMBOL, (1, 1, 1), str(tmp_path))["last_date"] == history.index[299].strftime("%Y-%m-%d")
+
+def test_enough_new_bars_warm_start_refit(tmp_path, fits):
+    history = _history()
+    first = fit(history.iloc[:300], symbol=SYMBOL, cache_dir=str(tmp_path))
+    fit(history.iloc[:300 + REFIT_EVERY], symbol=SYMBOL, cache_dir=str(tmp_path))
+    assert len(fits) == 2
+    assert fits[1]["maxiter"] == WARM_MAXITER
+    assert np.allclose(fits[1]["start_params"], first.params)
+
+def test_future_exog_strategies():
+    exog = np.arange(30, dtype=float)
+    assert np.array_equal(future_exog(exog, 3, "last"), np.full((3, 1), 29.0))
+    assert np.array_equal(future_exog(exog, 3, "mean", window=4), np.full((3, 1), 27.5))
+    with pytest.raises(ValueError):
+        future_exog(exog, 3, "median")
+
+def test_forecast_without_exog(tmp_path):
+    data = _history().iloc[:300]
+    predictions = forecast(data, days=4, exog_strategy=None, cache_dir=str(tmp_path))
+    assert len(predictions) == 4
+    assert predictions.index[0] == data.index[-1] + np.timedelta64(1, "D")
+    assert np.isfinite(predictions).all()
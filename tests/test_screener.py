@@ -0,0 +1,40 @@
+from conftest import make_frames
+from datastore import FETCH_MARGIN, FixtureSource
+from screener import Screener
+
+class RecordingSource(FixtureSource):
+    def __init__(self, frames):
+        super().__init__(frames)
+        self.requests = []
+
+    def fetch(self, symbol, start=None, end=None):
+        self.requests.append(([symbol], start))
+        return super().fetch(symbol, start, end)
+
+    def fetch_many(self, symbols, start=None, end=None):
+        self.requests.append((list(symbols), start))
+        return super().fetch_many(symbols, start, end)
+
+def test_ticker_without_rows_is_synced_incrementally(tmp_path):
+    source = RecordingSource(make_frames(["^JKSE", "AAAA.JK", "BBBB.JK"], days=200))
+    screener = Screener(str(tmp_path), source)
+    screener.sync(["AAAA.JK", "BBBB.JK", "NEWW.JK"])
+    assert screener.matrix.empty == {"NEWW.JK"}
+
+    reopened = Screener(str(tmp_path), source)
+    source.requests.clear()
+    reopened.sync(["AAAA.JK", "BBBB.JK", "NEWW.JK"])
+    recent = reopened.matrix.dates[-1] - FETCH_MARGIN
+    assert source.requests == [(["^JKSE"], recent), (["AAAA.JK", "BBBB.JK", "NEWW.JK"], recent)]
+
+def test_empty_ticker_moves_to_synced_once_it_has_rows(tmp_path):
+    frames = make_frames(["^JKSE", "AAAA.JK"], days=200)
+    source = RecordingSource({"^JKSE": frames["^JKSE"]})
+    screener = Screener(str(tmp_path), source)
+    screener.sync(["AAAA.JK"])
+    assert screener.matrix.empty == {"AAAA.JK"}
+
+    source.frames["AAAA.JK"] = frames["AAAA.JK"]
+    screener.sync(["AAAA.JK"])
+    assert screener.matrix.empty == set()
+    assert "AAAA.JK" in screener.matrix.synced
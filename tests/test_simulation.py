@@ -0,0 +1,35 @@
+import numpy as np
+
+from calculator import FLOOR_PRICE, price_limits
+from simulation import simulate_ara_arb, summarize_simulation
+
+def test_paths_never_break_the_floor():
+    result = simulate_ara_arb(60, board=2, days=10, n_paths=50_000, daily_volatility=0.2, chunk_size=10_000, seed=1)
+    assert result["exit_prices"].min() >= FLOOR_PRICE
+
+def test_path_on_the_floor_can_rise():
+    result = simulate_ara_arb(FLOOR_PRICE, board=1, days=3, n_paths=10_000, daily_volatility=0.2, chunk_size=2_500, seed=2)
+    assert result["exit_prices"].min() >= FLOOR_PRICE
+    assert result["exit_prices"].max() > FLOOR_PRICE
+    assert result["ara_days"].max() > 0
+
+def test_price_limits_at_the_floor():
+    upper, lower = price_limits([FLOOR_PRICE, 55, 1000], [2, 0, 2])
+    assert upper.tolist() == [67, 74, 1250]
+    assert lower.tolist() == [FLOOR_PRICE, FLOOR_PRICE + 2, 750]
+
+def test_acceleration_board_has_no_floor():
+    result = simulate_ara_arb(10, board=3, days=20, n_paths=10_000, daily_volatility=0.2, chunk_size=2_500, seed=3)
+    assert result["exit_prices"].min() < FLOOR_PRICE
+
+def test_paths_stay_on_the_tick_grid_and_within_limits():
+    result = simulate_ara_arb(4800, board=2, days=1, n_paths=10_000, daily_volatility=0.3, chunk_size=2_500, seed=4)
+    exit_prices = result["exit_prices"]
+    assert exit_prices.max() <= 6000 and exit_prices.min() >= 3600
+    assert np.all(exit_prices % np.where(exit_prices >= 5000, 25, 10) == 0)
+
+def test_summary_is_consistent():
+    result = simulate_ara_arb(1000, board=1, days=5, n_paths=20_000, chunk_size=5_000, seed=5)
+    summary, stats = summarize_simulation(result)
+    assert summary["exit_price"].drop("Mean").is_monotonic_increasing
+    assert 0 <= stats["probability_profit"] + stats["probability_loss"] <= 1
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_frames
+from datastore import FixtureSource, PriceStore
+from risk import VAR_SEED, _cholesky, returns_matrix, value_at_risk, var_breakdown
+
+def _returns():
+    frames = make_frames(["AAAA.JK", "BBBB.JK", "CCCC.JK"], days=250)
+    return returns_matrix(pd.concat({symbol: frame["Close"] for symbol, frame in frames.items()}, axis=1))
+
+def test_cholesky_of_zero_covariance_terminates():
+    factor = _cholesky(np.zeros((3, 3)))
+    assert np.all(np.isfinite(factor))
+
+def test_cholesky_gives_up_on_indefinite_matrix():
+    with pytest.raises(ValueError):
+        _cholesky(np.array([[1.0, 0.0], [0.0, -1e6]]))
+
+def test_monte_carlo_var_on_flat_holding():
+    returns = pd.DataFrame({"FLAT.JK": np.zeros(100)})
+    var, cvar = value_at_risk(returns, [1_000_000], method="monte_carlo", n_scenarios=10_000, chunk_size=2_500, seed=VAR_SEED)
+    # Only the diagonal jitter moves a flat holding, so the loss stays a rounding error of the exposure.
+    assert abs(var) < 1e-4 * 1_000_000 and abs(cvar) < 1e-4 * 1_000_000
+
+def test_monte_carlo_var_is_reproducible_with_seed():
+    returns = _returns()
+    first = value_at_risk(returns, [1e6, 2e6, 3e6], method="monte_carlo", n_scenarios=20_000, chunk_size=5_000, seed=VAR_SEED)
+    second = value_at_risk(returns, [1e6, 2e6, 3e6], method="monte_carlo", n_scenarios=20_000, chunk_size=5_000, seed=VAR_SEED)
+    assert first == second
+
+@pytest.mark.parametrize("confidence, horizon", [(0, 1), (1, 1), (1.5, 1), (0.95, 0), (0.95, -2), (0.95, 2.5)])
+def test_value_at_risk_rejects_bad_inputs(confidence, horizon):
+    with pytest.raises(ValueError):
+        value_at_risk(_returns(), [1e6, 2e6, 3e6], confidence, horizon)
+
+def test_historical_var_rejects_horizon_longer_than_sample():
+    returns = _returns()
+    with pytest.raises(ValueError):
+        value_at_risk(returns, [1e6, 2e6, 3e6], horizon=len(returns.dropna()), method="historical")
+
+def test_historical_var_matches_overlapping_windows():
+    returns = _returns()
+    exposures = np.array([1e6, 2e6, 3e6])
+    daily = returns.dropna().to_numpy() @ exposures
+    losses = -np.array([daily[i:i + 5].sum() for i in range(len(daily) - 4)])
+    var, cvar = value_at_risk(returns, exposures, 0.95, 5, "historical")
+    assert np.isclose(var, np.quantile(losses, 0.95))
+    assert np.isclose(cvar, losses[losses >= var].mean())
+
+def test_breakdown_rejects_flat_or_empty_returns():
+    with pytest.raises(ValueError):
+        var_breakdown(pd.DataFrame({"FLAT.JK": np.zeros(100)}), [1_000_000])
+    with pytest.raises(ValueError):
+        var_breakdown(pd.DataFrame({"AAAA.JK": [np.nan, 0.01]}), [1_000_000])
+
+def test_value_at_risk_without_quotes_prints_message(capsys):
+    from main import PortofolioAnalysis, PortofolioManager
+
+    manager = PortofolioManager(PriceStore(":memory:", FixtureSource()))
+    manager.stock = {"NONE": {"quantity": 1, "price": 1000.0}}
+    PortofolioAnalysis(manager).display_value_at_risk(n_scenarios=1_000)
+    assert "No stock with price data found." in capsys.readouterr().out
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from conftest import make_frames
+from rolling import RollingMetrics, rolling_metrics
+from watch import PortfolioWatcher, ReplayQuoteSource
+
+class Manager:
+    def __init__(self, holdings):
+        self.holdings = holdings
+
+    def get_all_stocks(self):
+        return self.holdings
+
+def _holdings(count):
+    return {f"S{i:03d}": {"quantity": 1, "price": 1000.0} for i in range(count)}
+
+class HangingThreadSource:
+    # A blocking provider call run in a worker thread, as YFinanceQuoteSource does, that outlives the
+    # watcher's timeout.
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self, symbols):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+        return {symbol: 1100.0 for symbol in symbols}
+
+    async def get_quotes(self, symbols):
+        return await asyncio.to_thread(self._fetch, symbols)
+
+def test_replay_updates_totals_incrementally():
+    holdings = _holdings(3)
+    ticks = {f"{item}.JK": [1000.0, 1100.0, 1050.0] for item in holdings}
+    watcher = PortfolioWatcher(Manager(holdings), ReplayQuoteSource(ticks), interval=0.01, batch_size=2, output=io.StringIO())
+    asyncio.run(watcher.run(iterations=3))
+    assert watcher.prices == {item: 1050.0 for item in holdings}
+    assert watcher.total_market_value == 3 * 1050.0 * 100
+
+def test_slow_batch_does_not_hold_back_the_rest():
+    holdings = _holdings(4)
+    ticks = {f"{item}.JK": [1200.0] for item in holdings}
+    source = ReplayQuoteSource(ticks, delays={"S000.JK": 5.0})
+    watcher = PortfolioWatcher(Manager(holdings), source, interval=0.01, batch_size=1, timeout=0.2, output=io.StringIO())
+    started = time.monotonic()
+    asyncio.run(watcher.run(iterations=1))
+    assert time.monotonic() - started < 2
+    assert set(watcher.prices) == {"S001", "S002", "S003"}
+
+def test_timed_out_threads_stay_within_concurrency():
+    source = HangingThreadSource(0.2)
+    watcher = PortfolioWatcher(Manager(_holdings(6)), source, interval=0.01, concurrency=2, batch_size=1, timeout=0.02,
+                               output=io.StringIO())
+    asyncio.run(watcher.run(iterations=2))
+    assert source.peak <= 2
+
+class FailingSource:
+    # Raises on every other poll, as a provider error or a dropped connection would.
+    def __init__(self, price):
+        self.price = price
+        self.calls = 0
+
+    async def get_quotes(self, symbols):
+        self.calls += 1
+        if self.calls % 2 == 0:
+            raise ConnectionError("provider unavailable")
+        return {symbol: self.price for symbol in symbols}
+
+def test_totals_ignore_holdings_that_never_quote():
+    holdings = _holdings(2)
+    watcher = PortfolioWatcher(Manager(holdings), ReplayQuoteSource({"S000.JK": [1100.0]}), interval=0.01,
+                               output=io.StringIO())
+    asyncio.run(watcher.run(iterations=1))
+    assert watcher.total_investment == 1000.0 * 100
+    assert watcher.total_market_value - watcher.total_investment == 100.0 * 100
+
+def test_failed_poll_marks_rows_stale_and_keeps_polling():
+    source = FailingSource(1100.0)
+    output = io.StringIO()
+    watcher = PortfolioWatcher(Manager(_holdings(2)), source, interval=0.01, output=output)
+    asyncio.run(watcher.run(iterations=2))
+    assert watcher.stale == {"S000", "S001"}
+    assert "S000*" in output.getvalue()
+    asyncio.run(watcher.run(iterations=1))
+    assert source.calls == 3
+    assert watcher.stale == set()
+    assert watcher.prices == {"S000": 1100.0, "S001": 1100.0}
+
+def test_interval_must_be_positive():
+    with pytest.raises(ValueError):
+        PortfolioWatcher(Manager(_holdings(1)), ReplayQuoteSource({}), interval=0)
+
+def test_rolling_metrics_follow_quotes():
+    holdings = _holdings(2)
+    frames = make_frames(["^JKSE"] + [f"{item}.JK" for item in holdings], days=100)
+    prices = pd.concat({symbol: frame["Close"] for symbol, frame in frames.items()}, axis=1)
+    rolling = RollingMetrics.from_prices(prices.iloc[:-1], windows=(20, 60))
+    ticks = {symbol: [prices[symbol].iloc[-1]] for symbol in prices.columns}
+    output = io.StringIO()
+    watcher = PortfolioWatcher(Manager(holdings), ReplayQuoteSource(ticks), interval=0.01, output=output, rolling=rolling)
+    asyncio.run(watcher.run(iterations=1))
+
+    expected = rolling_metrics(prices, windows=(20,))[20].iloc[-1]
+    for item in holdings:
+        assert watcher.metrics.loc[f"{item}.JK", "beta"] == pytest.approx(expected[("beta", f"{item}.JK")])
+        assert f"{expected[('beta', f'{item}.JK')]:>12.2f}" in output.getvalue()
+    assert "Beta 20d" in output.getvalue()
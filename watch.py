@@ -0,0 +1,188 @@
+import asyncio
+import sys
+import time
+
+import pandas as pd
+from colorama import Fore, Style
+
+from datastore import FETCH_MARGIN, YFinanceSource, fetch_many, period_start
+
+class YFinanceQuoteSource:
+    def __init__(self, source=None, timeout=10):
+        # One attempt per poll, each HTTP request bounded by timeout, so a worker thread always returns;
+        # the next poll is the retry.
+        self.source = source if source is not None else YFinanceSource(retries=1, timeout=timeout)
+
+    async def get_quotes(self, symbols):
+        # yfinance is blocking; run each batch request in a worker thread so other batches keep polling.
+        frames = await asyncio.to_thread(fetch_many, self.source, symbols, period_start("1d") - FETCH_MARGIN)
+        return {symbol: float(frame["Close"].iloc[-1]) for symbol, frame in frames.items() if not frame.empty}
+
+class ReplayQuoteSource:
+    def __init__(self, ticks, delays=None):
+        # ticks: {symbol: [price, price, ...]}, replayed one price per poll; delays: {symbol: seconds}.
+        self.ticks = {symbol: list(prices) for symbol, prices in ticks.items()}
+        self.delays = delays or {}
+        self.positions = {symbol: 0 for symbol in ticks}
+
+    async def get_quotes(self, symbols):
+        await asyncio.sleep(max((self.delays.get(symbol, 0.0) for symbol in symbols), default=0.0))
+        quotes = {}
+        for symbol in symbols:
+            position = self.positions.get(symbol, 0)
+            if position < len(self.ticks.get(symbol, [])):
+                quotes[symbol] = self.ticks[symbol][position]
+                self.positions[symbol] = position + 1
+        return quotes
+
+class PortfolioWatcher:
+    HEADER = f"{'Stock':<8}{'Quantity':>10}{'Price Bought':>14}{'Market Price':>14}{'Market Value':>18}{'Profit/Loss':>18}{'Change (%)':>12}"
+
+    def __init__(self, stock_manager, source=None, interval=5.0, concurrency=8, batch_size=20, timeout=None, output=None, rolling=None):
+        if interval <= 0:
+            raise ValueError(f"Refresh interval must be positive, got {interval}")
+        self.holdings = stock_manager.get_all_stocks()
+        self.items = list(self.holdings)
+        self.interval = interval
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout if timeout is not None else max(interval, 1.0) * 2
+        self.source = source if source is not None else YFinanceQuoteSource(timeout=self.timeout)
+        self.output = output if output is not None else sys.stdout
+        self.prices = {}
+        # Holdings whose last poll failed; they keep their last price, marked with '*'.
+        self.stale = set()
+        # Both totals cover only holdings that have quoted, like overall_portfolio_performance, so a
+        # symbol that has not quoted yet (or never does) is not counted as a loss.
+        self.total_investment = 0.0
+        self.total_market_value = 0.0
+        self.updates = 0
+        # Optional RollingMetrics over the holdings and benchmark: every quote revises today's bar, and
+        # the shortest window's volatility and beta are shown next to each holding.
+        self.rolling = rolling
+        self.window = int(rolling.windows[0]) if rolling is not None else None
+        self.metrics = rolling.latest()[self.window] if rolling is not None else None
+        self.fed = dict(zip(rolling.columns, rolling.close)) if rolling is not None else {}
+
+    def _header(self):
+        if self.rolling is None:
+            return self.HEADER
+        return f"{self.HEADER}{f'Vol {self.window}d':>12}{f'Beta {self.window}d':>12}"
+
+    def _format_metrics(self, item):
+        if self.rolling is None:
+            return ""
+        volatility, beta = self.metrics.loc[f"{item}.JK", ["volatility", "beta"]]
+        return (f"{'-':>12}" if pd.isna(volatility) else f"{volatility:>12.2%}") + (f"{'-':>12}" if pd.isna(beta) else f"{beta:>12.2f}")
+
+    def _format_row(self, item):
+        info, price = self.holdings[item], self.prices.get(item)
+        label = f"{item}*" if item in self.stale else item
+        if price is None:
+            return f"{label:<8}{info['quantity']:>10}{info['price']:>14.2f}{'-':>14}{'-':>18}{'-':>18}{'-':>12}{self._format_metrics(item)}"
+        market_value = price * info['quantity'] * 100
+        profit_loss = market_value - info['price'] * info['quantity'] * 100
+        percentage_change = (price - info['price']) / info['price'] * 100 if info['price'] != 0 else 0
+        color = Fore.GREEN if profit_loss >= 0 else Fore.RED
+        return (f"{label:<8}{info['quantity']:>10}{info['price']:>14.2f}{price:>14.2f}{market_value:>18.2f}"
+                f"{color}{profit_loss:>18.2f}{percentage_change:>11.2f}%{Style.RESET_ALL}{self._format_metrics(item)}")
+
+    def _format_footer(self):
+        profit_loss = self.total_market_value - self.total_investment
+        color = Fore.GREEN if profit_loss >= 0 else Fore.RED
+        return (f"Total market value: Rp{self.total_market_value:.2f}  P/L: {color}Rp{profit_loss:.2f}{Style.RESET_ALL}"
+                f"  Updated: {time.strftime('%H:%M:%S')}{'  * stale' if self.stale else ''}  (Ctrl+C to stop)")
+
+    def _rewrite_line(self, lines_up, text):
+        # The cursor rests on the line below the footer; jump up, replace the line, jump back.
+        self.output.write(f"\x1b[{lines_up}A\r\x1b[2K{text}\x1b[{lines_up}B\r")
+
+    def draw(self):
+        lines = [self._header()] + [self._format_row(item) for item in self.items] + [self._format_footer()]
+        self.output.write("\n".join(lines) + "\n")
+        self.output.flush()
+
+    def _update_rolling(self, quotes):
+        # Quotes carry no bar date, so a new bar is only started by a price that moved; repeated closes
+        # on a non-trading day would otherwise add a bar of zero returns.
+        moved = {symbol: price for symbol, price in quotes.items() if symbol in self.fed and price != self.fed[symbol]}
+        if not moved:
+            return False
+        self.rolling.update(moved, pd.Timestamp.today().normalize())
+        self.fed.update(moved)
+        self.metrics = self.rolling.latest()[self.window]
+        return True
+
+    def update(self, quotes):
+        changed = False
+        if self.rolling is not None and self._update_rolling(quotes):
+            # Betas move with the benchmark, so every row is redrawn.
+            for item in self.items:
+                self._rewrite_line(len(self.items) - self.items.index(item) + 1, self._format_row(item))
+            changed = True
+        for symbol, price in quotes.items():
+            item = symbol[:-3] if symbol.endswith(".JK") else symbol
+            if item not in self.holdings or (self.prices.get(item) == price and item not in self.stale):
+                continue
+            self.stale.discard(item)
+            # Adjust the running total by this holding's change instead of re-summing the portfolio.
+            quantity = self.holdings[item]['quantity'] * 100
+            if item not in self.prices:
+                self.total_investment += self.holdings[item]['price'] * quantity
+            self.total_market_value += (price - self.prices.get(item, 0.0)) * quantity
+            self.prices[item] = price
+            self._rewrite_line(len(self.items) - self.items.index(item) + 1, self._format_row(item))
+            changed = True
+        if changed:
+            self.updates += 1
+            self._rewrite_line(1, self._format_footer())
+            self.output.flush()
+
+    def mark_stale(self, symbols):
+        items = [symbol[:-3] if symbol.endswith(".JK") else symbol for symbol in symbols]
+        fresh = [item for item in items if item in self.holdings and item not in self.stale]
+        if not fresh:
+            return
+        for item in fresh:
+            self.stale.add(item)
+            self._rewrite_line(len(self.items) - self.items.index(item) + 1, self._format_row(item))
+        self._rewrite_line(1, self._format_footer())
+        self.output.flush()
+
+    async def _watch_batch(self, symbols, semaphore, iterations):
+        def finished(request):
+            semaphore.release()
+            # Abandoned requests are never awaited again; collect their outcome so a failure is not
+            # reported as an unretrieved task exception.
+            if not request.cancelled():
+                request.exception()
+
+        count = 0
+        while iterations is None or count < iterations:
+            started = time.monotonic()
+            await semaphore.acquire()
+            request = asyncio.ensure_future(self.source.get_quotes(symbols))
+            # A fetch in a worker thread keeps running after wait_for gives up on it, so the slot is freed
+            # when the request finishes rather than when the poll times out; otherwise hung requests would
+            # pile up threads past the concurrency limit.
+            request.add_done_callback(finished)
+            try:
+                quotes = await asyncio.wait_for(asyncio.shield(request), self.timeout)
+            except Exception:
+                # A timed-out or failed request must not end the session: mark the batch stale and poll again.
+                self.mark_stale(symbols)
+                quotes = {}
+            if quotes:
+                self.update(quotes)
+            count += 1
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    async def run(self, iterations=None):
+        self.draw()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        symbols = [f"{item}.JK" for item in self.items]
+        if self.rolling is not None:
+            symbols.append(self.rolling.benchmark)
+        # Each batch polls on its own schedule, so one slow ticker never holds back the rest of the table.
+        batches = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        await asyncio.gather(*(self._watch_batch(batch, semaphore, iterations) for batch in batches))